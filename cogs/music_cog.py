@@ -5,11 +5,22 @@ from discord.ui import LayoutView, TextDisplay, Section, ActionRow, Button, Cont
 import settings
 import asyncio
 from settings import logger
+from cogs.music_metadata import _extract_metadata, _write_art
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3
 from io import BytesIO
-import json
+import hashlib
+import heapq
 import os
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 from pathlib import Path
 import soundfile as sf
@@ -37,69 +48,439 @@ try:
 except ImportError:
     pass
 
+# orjson is much faster for the song cache and stats files, but keep working without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes with orjson, or the stdlib json module if orjson isn't installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+def _json_loads(data: bytes):
+    """Parse JSON bytes with orjson, or the stdlib json module if orjson isn't installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # Music cog configuration
 SONGS_DIR = Path(__file__).parent.parent / "songs"
+ART_DIR = SONGS_DIR / ".art"  # Album art extracted while building the song cache
+
+# Patterns used to clean TTS announcement text
+_FEAT_RE = re.compile(r'feat\.', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+# custom_id formats of the queue and stop message buttons
+_REMOVE_ID_RE = re.compile(r'remove_(priority|regular)_(\d+)_(\d+)', re.ASCII)
+_PLAY_AGAIN_ID_RE = re.compile(r'play_again_(\d+)', re.ASCII)
+
+def _format_duration(duration: int | None) -> str:
+    """Display string (m:ss) of a song duration in seconds"""
+    return f"{duration // 60}:{duration % 60:02d}" if duration else "Unknown"
+
+def _library_signature(root: Path) -> str:
+    """Hash of (path, mtime_ns, size) for every MP3 under root; changes whenever the library does"""
+    entries = []
+    stack = [str(root)] if root.is_dir() else []
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.mp3') and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime_ns, stat.st_size))
+
+    entries.sort()
+    digest = hashlib.blake2b(digest_size=8)
+    for path, mtime_ns, size in entries:
+        digest.update(f"{path}\0{mtime_ns}\0{size}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+def _new_stats_entry(now: float) -> dict:
+    """Empty statistics of a song seen for the first time"""
+    return {
+        # Queue tracking
+        'queued_total': 0,
+        'queued_priority': 0,
+        'queued_regular': 0,
+        'first_queued': now,
+        'last_queued': now,
+
+        # Playback tracking
+        'started_plays': 0,
+        'started_priority': 0,
+        'started_regular': 0,
+        'completed_plays': 0,
+        'completed_priority': 0,
+        'completed_regular': 0,
+        'skipped_plays': 0,
+        'skipped_priority': 0,
+        'skipped_regular': 0,
+        'first_played': None,
+        'last_played': None,
+
+        # Time tracking
+        'total_play_time': 0,
+        'session_count': 0,
+
+        # User tracking
+        'request_users': Counter()
+    }
+
+# Kokoro pipeline shared by every cog instance, loaded once on the TTS thread
+_tts_pipeline = None
+
+def _get_tts_pipeline():
+    """Load the Kokoro pipeline on first use and reuse it for the life of the process"""
+    global _tts_pipeline
+    if _tts_pipeline is None:
+        import torch
+
+        # TTS_DEVICE: 'auto' (CUDA when available), 'cuda' or 'cpu'
+        device = settings.TTS_DEVICE
+        if device == 'auto':
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if device == 'cuda':
+            torch.backends.cudnn.benchmark = True
+        pipeline = KPipeline(lang_code='a', repo_id='hexgrad/Kokoro-82M', device=device)  # American English
+        logger.info(f"Loaded Kokoro TTS pipeline on {device}")
+        if settings.TTS_QUANTIZE:
+            _quantize_tts_model(pipeline.model)
+        _tts_pipeline = pipeline
+    return _tts_pipeline
+
+def _quantize_tts_model(model):
+    """Dynamically quantize the Linear layers of Kokoro's acoustic model to int8, keeping the vocoder in FP32"""
+    import torch
+
+    if model is None or next(model.parameters()).device.type != 'cpu':
+        # Dynamic quantization only has CPU kernels
+        return
+    # Everything but the decoder (the vocoder) - text encoders and prosody predictor
+    qconfig_spec = {
+        name: torch.ao.quantization.default_dynamic_qconfig
+        for name, _ in model.named_children() if name != 'decoder'
+    }
+    torch.ao.quantization.quantize_dynamic(
+        model,
+        qconfig_spec,
+        dtype=torch.qint8,
+        mapping={torch.nn.Linear: torch.ao.nn.quantized.dynamic.Linear},
+        inplace=True
+    )
+    logger.info(f"Quantized Kokoro submodules to int8: {', '.join(qconfig_spec)}")
+
+def _synthesize_tts(text: str, voice_name: str):
+    """Run Kokoro inference for one announcement, returning 24 kHz audio or None"""
+    import torch
+
+    pipeline = _get_tts_pipeline()
+
+    # Collect all audio segments (no autograd bookkeeping needed for inference)
+    audio_segments = []
+    total = 0
+    with torch.inference_mode():
+        for gs, ps, audio in pipeline(text=text, voice=voice_name, speed=1.0):
+            audio = audio.cpu() if audio.device.type != 'cpu' else audio
+            audio_segments.append(audio)
+            total += audio.shape[0]
+    if not audio_segments:
+        return None
+
+    if len(audio_segments) == 1:
+        return audio_segments[0]
+
+    # Copy the segments into one preallocated buffer
+    final_audio = np.empty(total, dtype=np.asarray(audio_segments[0]).dtype)
+    offset = 0
+    for audio in audio_segments:
+        final_audio[offset:offset + audio.shape[0]] = audio
+        offset += audio.shape[0]
+    return final_audio
+
+def _render_tts(text: str, voice_name: str, path: Path) -> bytes | None:
+    """Synthesize an announcement to 16-bit WAV bytes and store them at path, None if Kokoro produced nothing"""
+    audio = _synthesize_tts(text, voice_name)
+    if audio is None:
+        return None
+    buffer = BytesIO()
+    sf.write(buffer, audio, 24000, format='WAV', subtype='PCM_16')
+    wav = buffer.getvalue()
+    # Write beside the target and rename so a half-written file is never played
+    partial_path = path.with_suffix('.part')
+    partial_path.write_bytes(wav)
+    os.replace(partial_path, path)
+    return wav
+
+@dataclass(slots=True)
+class TimerState:
+    """Alone-in-voice-channel timer of a guild"""
+    started_at: float  # time.monotonic() when the channel became empty
+    cancelled: bool = False  # set when someone returns before the timeout
+    countdown: asyncio.TimerHandle | None = None  # next countdown presence refresh scheduled for this timer
+
+class SongTrie:
+    """Prefix trie over the lowercased words of song titles, artists and display names"""
+    __slots__ = ('children', 'song_indices')
+    MAX_INDICES = 50  # song indices kept per node, enough to fill one autocomplete page
+
+    def __init__(self):
+        self.children = {}  # char -> SongTrie
+        self.song_indices = []  # song_cache indices of songs with a word starting with this prefix
+
+    def insert(self, word: str, index: int):
+        """Record song index under every prefix of word"""
+        node = self
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = SongTrie()
+            node = child
+            # All words of a song are inserted together, so a repeat can only be the last entry
+            indices = node.song_indices
+            if len(indices) < self.MAX_INDICES and (not indices or indices[-1] != index):
+                indices.append(index)
+
+    def search(self, prefix: str) -> list[int]:
+        """Song indices with a word starting with prefix (at most MAX_INDICES)"""
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.song_indices
 
 class MusicCog(commands.Cog):
+    # Static send_message payloads for the skip command's early returns
+    _SKIP_MSG_NO_VOICE = {"content": "You are not connected to a voice channel.", "ephemeral": True}
+    _SKIP_MSG_NOT_CONNECTED = {"content": "I'm not currently playing music.", "ephemeral": True}
+    _SKIP_MSG_NOT_PLAYING = {"content": "No song is currently playing.", "ephemeral": True}
+    # Pause button (label, emoji) by paused state, and loop button (label, emoji, style) by loop mode
+    _PAUSE_BUTTON = {False: ("Pause", "⏸️"), True: ("Resume", "▶️")}
+    _LOOP_BUTTON = {
+        'off': ("Loop: Off", "🔁", discord.ButtonStyle.secondary),
+        'single': ("Loop: Single", "🔂", discord.ButtonStyle.primary),
+        'queue': ("Loop: Queue", "🔁", discord.ButtonStyle.primary),
+    }
+
     def __init__(self, bot):
         self.bot = bot
         self.song_cache = None
+        self._cache_load_lock = asyncio.Lock()  # serializes song cache loads from startup and autocomplete
+        self.song_by_name: dict[str, dict] = {}  # display_name -> song_info, rebuilt with the song cache
+        self.song_by_path: dict[str, dict] = {}  # file_path -> song_info, rebuilt with the song cache
+        self._song_paths = []  # song_cache[i]['file_path'], rebuilt with the song cache
         self.cache_timestamp = 0
+        self.library_signature = None  # _library_signature() of SONGS_DIR the cache was built from
         self.CACHE_DURATION = 300  # 5 minutes
-        self.music_queues = {}  # guild_id -> list of song_info dicts
-        self.now_playing = {}   # guild_id -> current song_info dict
-        self.priority_queues = {}  # guild_id -> list of priority song_info dicts
+        self.music_queues = {}  # guild_id -> deque of song_info dicts
+        self.now_playing: OrderedDict[int, dict] = OrderedDict()   # guild_id -> current song_info dict, least recently set first
+        self.MAX_GUILDS_NOW_PLAYING = 10_000  # cap on now_playing entries, oldest evicted first
+        self.priority_queues = {}  # guild_id -> deque of priority song_info dicts
         self.pause_states = {}  # guild_id -> bool (True if paused)
         self.loop_modes = {}   # guild_id -> str ('off', 'single', 'queue')
-        self.voice_check_task = None
         self.ALONE_TIMEOUT = 180  # 3 minutes in seconds
-        self.EMPTY_CHANNEL_TIMEOUT = 30  # 30 seconds for empty channel
+        self.PRESENCE_UPDATE_INTERVAL = 30  # seconds between disconnect countdown presence refreshes
+        self.PRESENCE_THRESHOLD = 60  # timeouts this short skip the countdown refreshes entirely
         self.CACHE_FILE = SONGS_DIR / "song_cache.json"
+        self._cache_dirty = asyncio.Event()  # set by save_song_cache, cleared when _cache_flusher writes the file
+        self.CACHE_SAVE_DELAY = 5  # seconds to collect further cache saves before writing once
         self.STATS_FILE = SONGS_DIR / "song_stats.json"
         self.song_stats = {}  # file_path -> stats dict
-        self.current_play_start = {}  # guild_id -> timestamp when current song started
+        self._stats_dirty = False  # set by stats updates, cleared when _stats_flusher writes the file
+        self._stats_task = None  # running _stats_flusher, started by the first update after a write
+        self.TOP_PLAYED_SIZE = 10  # songs listed by /topplayed
+        self._stats_handlers = {  # update_song_stats event_type -> handler
+            'queued': self._stats_queued,
+            'started': self._stats_started,
+            'completed': self._stats_completed,
+            'skipped': self._stats_skipped,
+        }
+        self._top_played = []  # file_paths of the TOP_PLAYED_SIZE most started songs, most played first
+        self.STATS_FLUSH_INTERVAL = 5  # seconds between stats file writes while stats are dirty
+        self.current_play_start = {}  # guild_id -> time.monotonic() when current song started
         self.skip_in_progress = {}  # guild_id -> bool (True if song is being skipped)
         self.stop_in_progress = {}  # guild_id -> bool (True if stop operation is in progress)
         self.current_queue_type = {}  # guild_id -> str ('priority' or 'regular') for currently playing song
+        self._queued_paths = {}  # guild_id -> Counter of file_paths that are queued or now playing
+        self._queue_art = {}  # guild_id -> (queue message id, file_path whose album art that message has attached)
+        self._queue_render_state = {}  # guild_id -> _queue_state_key of the last queue message edit
+        self._button_handlers = {  # first word of a component custom_id -> handler
+            'remove': self.handle_remove_button,
+            'queue': self.handle_queue_button,
+            'play': self.handle_play_again_button,
+        }
+        self._queue_actions = {  # queue_{action}_{guild_id} button action -> handler
+            'skip': self._queue_action_skip,
+            'stop': self._queue_action_stop,
+            'pause': self._queue_action_pause,
+            'loop': self._queue_action_loop,
+            'clear': self._queue_action_clear,
+            'shuffle': self._queue_action_shuffle,
+        }
+        self._search_keys = []  # casefolded 'title artist display_name' per song_cache entry, for the trie
+        self._search_keys_b = []  # _search_keys encoded to UTF-8, for the substring scans
+        self._song_trie = SongTrie()  # word prefixes of _search_keys -> song_cache indices
+        self._song_display = []  # song_cache[i]['display_name'], parallel to _search_keys
+        self._ac_last = None  # (term, all matching indices, _search_keys_b it was computed on) of the last short autocomplete result
+        self._ac_lock = threading.Lock()  # guards the search indices and _ac_last, shared by the _io_pool threads running autocomplete
+        self._human_counts = {}  # voice channel_id -> number of non-bot members
+        self._timer_tasks = {}  # guild_id -> pending schedule_disconnect task, cancelled when someone returns
+        self._alone_timers = {}  # guild_id -> TimerState of the running alone timer
+        self._presence_handles = {}  # guild_id -> TimerHandle of a pending presence update
+        self.PRESENCE_DEBOUNCE = 0.5  # seconds to coalesce bursts of voice state events
+        self.PRESENCE_BATCH_WINDOW = 0.06  # minimum gap between two change_presence calls
+        self._presence_queue = asyncio.Queue()  # desired activities (None clears), consumed by _presence_worker
+        self.RETRY_ATTEMPTS = 5  # attempts for transient Discord failures
+        self.RETRY_BASE_DELAY = 0.1  # seconds, doubled per attempt before jitter
+        self.RETRY_MAX_DELAY = 5.0  # seconds, cap on a single backoff sleep
+
+        # Shared worker threads for blocking work, so autocomplete is not starved by a long library scan
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="music-io")
+        self._scan_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="music-scan")
+        # Kokoro inference is CPU bound, keep it on its own thread off the event loop
+        self._tts_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="music-tts")
 
         # TTS Configuration
         self.tts_enabled = True  # Enable/disable TTS announcements
         self.tts_temp_dir = Path(__file__).parent.parent / "temp"  # Project temp directory for audio files
         self.tts_temp_dir.mkdir(parents=True, exist_ok=True)
+        self.tts_cache_dir = SONGS_DIR / ".tts"  # Rendered announcements, reused on every later play
+        self.tts_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.TTS_CACHE_MAX_FILES = 500  # cached announcements kept, least recently played deleted first
+        if self.tts_enabled:
+            # Warm the pipeline in the background so the first announcement doesn't pay the model load
+            self._tts_pool.submit(_get_tts_pipeline)
+
+        # One-off background tasks; the event loop only keeps weak references to tasks, so hold them here
+        self._background_tasks = set()
 
         # Clean up any leftover temp files on startup
-        asyncio.create_task(self.cleanup_temp_files())
+        self._spawn(self.cleanup_temp_files())
 
         # Create initial cache on startup
-        asyncio.create_task(self.initialize_cache())
-        asyncio.create_task(self.load_song_stats())
+        self._spawn(self.initialize_cache())
+        self._spawn(self.load_song_stats())
+
+        # Single writer for Rich Presence so updates from all guilds are coalesced
+        self._presence_task = asyncio.create_task(self._presence_worker())
+
+        # Single background filler for the random-song refills requested after skips and song ends
+        self._refill_pending = {}  # guild_id -> regular queue length to top up to
+        self._refill_event = asyncio.Event()
+        self._refill_task = asyncio.create_task(self._refill_loop())
+
+        # Debounced song cache writes, so a burst of saves costs a single write
+        self._cache_task = asyncio.create_task(self._cache_flusher())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a one-off background task, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def cog_unload(self):
+        """Release the worker threads when the cog is unloaded"""
+        self._presence_task.cancel()
+        self._refill_task.cancel()
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+        self._cache_task.cancel()
+        if self._cache_dirty.is_set():
+            # Final flush of a save still waiting out its delay
+            try:
+                self._write_song_cache(self._song_cache_payload())
+            except Exception as e:
+                logger.error(f"Failed to save song cache: {e}")
+        if self._stats_dirty:
+            # Final flush so the last few seconds of stats aren't lost
+            self.save_song_stats()
+        for task in self._timer_tasks.values():
+            task.cancel()
+        for task in self._background_tasks:
+            task.cancel()
+        self._io_pool.shutdown(wait=False)
+        self._scan_pool.shutdown(wait=False)
+        self._tts_pool.shutdown(wait=False)
+
+    async def _run_io(self, func, *args):
+        """Run a blocking function on the shared I/O thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, func, *args)
+
+    def _remove_temp_files(self) -> int:
+        """Delete leftover tts_*.wav files from older versions (blocking, runs on the I/O pool)"""
+        removed = 0
+        with os.scandir(self.tts_temp_dir) as it:
+            for entry in it:
+                if entry.name.startswith('tts_') and entry.name.endswith('.wav'):
+                    try:
+                        os.unlink(entry.path)
+                        removed += 1
+                    except OSError as e:
+                        logger.warning(f"Failed to clean up temp file {entry.path}: {e}")
+        return removed
 
     async def cleanup_temp_files(self):
         """Clean up any leftover TTS temp files on startup"""
         try:
-            if self.tts_temp_dir.exists():
-                for temp_file in self.tts_temp_dir.glob("tts_*.wav"):
-                    try:
-                        temp_file.unlink()
-                        logger.info(f"Cleaned up leftover temp file: {temp_file.name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to clean up temp file {temp_file}: {e}")
+            removed = await self._run_io(self._remove_temp_files)
+            if removed:
+                logger.info(f"Cleaned up {removed} leftover TTS temp files")
         except Exception as e:
             logger.error(f"Error during temp file cleanup: {e}")
+        await self.prune_tts_cache()
+
+    def _prune_tts_cache(self) -> int:
+        """Delete the least recently played announcements beyond TTS_CACHE_MAX_FILES (blocking, runs on the I/O pool)"""
+        clips = []
+        with os.scandir(self.tts_cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.wav'):
+                    try:
+                        clips.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        excess = len(clips) - self.TTS_CACHE_MAX_FILES
+        if excess <= 0:
+            return 0
+
+        removed = 0
+        # Cache hits touch their clip, so the oldest mtimes are the least recently played
+        for _, path in heapq.nsmallest(excess, clips):
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Failed to prune TTS clip {path}: {e}")
+        return removed
+
+    async def prune_tts_cache(self):
+        """Keep the TTS cache directory within TTS_CACHE_MAX_FILES"""
+        try:
+            removed = await self._run_io(self._prune_tts_cache)
+            if removed:
+                logger.info(f"Pruned {removed} cached TTS announcements")
+        except Exception as e:
+            logger.error(f"Error pruning TTS cache: {e}")
 
     def clean_text_for_tts(self, text: str) -> str:
         """Clean text for TTS by removing non-ASCII characters and replacing abbreviations"""
-        import re
-
         # Replace "feat." with "feature" (more flexible pattern)
-        text = re.sub(r'feat\.', 'feature', text, flags=re.IGNORECASE)
+        text = _FEAT_RE.sub('feature', text)
 
         # Keep only ASCII characters (removes Japanese, Chinese, etc.)
         # This preserves parentheses, brackets, and other punctuation that are part of song titles
-        text = re.sub(r'[^\x00-\x7F]+', '', text)
+        text = text.encode('ascii', 'ignore').decode('ascii')
 
         # Clean up extra whitespace and normalize spaces
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', text).strip()
 
         return text
 
@@ -109,111 +490,78 @@ class MusicCog(commands.Cog):
             return
 
         try:
-            # Initialize Kokoro pipeline (create once and reuse)
-            if not hasattr(self, 'tts_pipeline'):
-                self.tts_pipeline = KPipeline(lang_code='a', repo_id='hexgrad/Kokoro-82M')  # American English
-
-            # Generate TTS audio
-            generator = self.tts_pipeline(
-                text=text,
-                voice=voice_name,
-                speed=1.0
-            )
-
-            # Collect all audio segments
-            audio_segments = []
-            for i, (gs, ps, audio) in enumerate(generator):
-                audio_segments.append(audio)
-
-            if not audio_segments:
-                logger.warning("No audio generated by TTS")
-                return
-
-            # Concatenate all audio segments
-            if len(audio_segments) == 1:
-                final_audio = audio_segments[0]
+            # Announcements are rendered once per (voice, text) and replayed from disk afterwards
+            key = hashlib.sha1(f"{voice_name}\n{text}".encode('utf-8')).hexdigest()
+            tts_path = self.tts_cache_dir / f"{key}.wav"
+
+            wav = None
+            if not tts_path.exists():
+                # Generate TTS audio on the TTS thread (the pipeline is loaded there once and reused)
+                wav = await asyncio.get_running_loop().run_in_executor(
+                    self._tts_pool, _render_tts, text, voice_name, tts_path
+                )
+                if wav is None:
+                    logger.warning("No audio generated by TTS")
+                    return
+                self._spawn(self.prune_tts_cache())
             else:
-                final_audio = np.concatenate(audio_segments)
-
-            # Create temporary file for the audio
-            import uuid
-            temp_filename = f"tts_{uuid.uuid4().hex}.wav"
-            temp_path = os.path.join(self.tts_temp_dir, temp_filename)
-
-            # Save audio to temporary file
-            sf.write(temp_path, final_audio, 24000)
+                # Mark the clip as recently played for the cache pruning
+                await self._run_io(os.utime, tts_path)
 
             # Play the TTS audio
             voice_client = guild.voice_client
             if voice_client and voice_client.is_connected():
-                # Create audio source from the temp file
-                tts_source = discord.FFmpegPCMAudio(temp_path)
-
-                # Play TTS (this will interrupt current music if playing)
-                voice_client.play(tts_source)
+                if wav is not None:
+                    # Freshly rendered: feed the WAV to FFmpeg's stdin instead of reading it back from disk
+                    tts_source = discord.FFmpegPCMAudio(BytesIO(wav), pipe=True)
+                else:
+                    # Create audio source from the cached announcement
+                    tts_source = discord.FFmpegPCMAudio(str(tts_path))
 
-                # Wait for TTS to finish, then clean up
-                while voice_client.is_playing():
-                    await asyncio.sleep(0.1)
+                # Play TTS (this will interrupt current music if playing), the player thread
+                # signals completion through the after callback
+                done = asyncio.Event()
+                loop = asyncio.get_running_loop()
+                voice_client.play(tts_source, after=lambda e: loop.call_soon_threadsafe(done.set))
 
-                # Clean up temp file
-                try:
-                    os.remove(temp_path)
-                except Exception as e:
-                    logger.warning(f"Failed to clean up TTS temp file {temp_path}: {e}")
+                # Wait for TTS to finish
+                await done.wait()
 
         except Exception as e:
             logger.error(f"TTS error: {e}")
-            # Clean up any temp files on error
-            try:
-                if 'temp_path' in locals() and os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except:
-                pass
 
     async def initialize_cache(self):
         """Initialize song cache on startup"""
         try:
             # Try to load existing cache first
-            if not self.load_song_cache():
+            async with self._cache_load_lock:
+                loaded = await self.load_song_cache()
+                if not loaded:
+                    # Autocomplete sees an empty library while the cache is built below
+                    self.song_cache = []
+            if not loaded:
                 # If no valid cache exists, build one
-                import time
                 current_time = time.time()
-                self.song_cache = []
                 self.cache_timestamp = current_time
 
                 def get_song_metadata():
+                    self.library_signature = _library_signature(SONGS_DIR)
+                    paths = [str(mp3_file) for mp3_file in SONGS_DIR.glob("**/*.mp3")]
+
+                    # Parsed on this scan thread: a process pool would re-import the bot's main
+                    # module (and with it the logging setup) in every worker, or fork a threaded process
                     songs_with_metadata = []
-                    for mp3_file in SONGS_DIR.glob("**/*.mp3"):
-                        try:
-                            audio = MP3(mp3_file, ID3=ID3)
-                            title = audio.get('TIT2', mp3_file.stem).text[0] if audio.get('TIT2') else mp3_file.stem
-                            artist = audio.get('TPE1', 'Unknown Artist').text[0] if audio.get('TPE1') else 'Unknown Artist'
-
-                            # Create display name with artist
-                            display_name = f"{title} - {artist}"
-                            songs_with_metadata.append({
-                                'file_path': str(mp3_file),  # Convert Path to string for JSON
-                                'title': title,
-                                'artist': artist,
-                                'display_name': display_name,
-                                'duration': int(audio.info.length) if audio.info else 0
-                            })
-                        except Exception as e:
-                            logger.warning(f"Could not read metadata for {mp3_file}: {e}")
-                            # Fallback to filename
-                            songs_with_metadata.append({
-                                'file_path': str(mp3_file),
-                                'title': mp3_file.stem,
-                                'artist': 'Unknown Artist',
-                                'display_name': f"{mp3_file.stem} - Unknown Artist",
-                                'duration': 0
-                            })
+                    for path_str in paths:
+                        song_info, error = _extract_metadata(path_str, str(ART_DIR))
+                        if error is not None:
+                            logger.warning(f"Could not read metadata for {song_info['file_path']}: {error}")
+                        songs_with_metadata.append(song_info)
 
                     return songs_with_metadata
 
-                self.song_cache = await asyncio.to_thread(get_song_metadata)
+                self.song_cache = await asyncio.get_running_loop().run_in_executor(self._scan_pool, get_song_metadata)
                 self.cache_timestamp = current_time
+                self._rebuild_indices()
                 logger.info(f"Built initial song cache: {len(self.song_cache)} songs")
 
                 # Save the initial cache
@@ -233,17 +581,17 @@ class MusicCog(commands.Cog):
             return
 
         # Check bot permissions for voice channel
-        bot_member = interaction.guild.get_member(self.bot.user.id)
-        if not interaction.user.voice.channel.permissions_for(bot_member).connect:
+        permissions = interaction.user.voice.channel.permissions_for(interaction.guild.me)
+        if not permissions.connect:
             await interaction.response.send_message("I don't have permission to connect to your voice channel.", delete_after=10)
             return
-        if not interaction.user.voice.channel.permissions_for(bot_member).speak:
+        if not permissions.speak:
             await interaction.response.send_message("I don't have permission to speak in your voice channel.", delete_after=10)
             return
 
         # Verify the song exists in cache
-        song_exists = any(song['display_name'] == song_name for song in self.song_cache) if self.song_cache else False
-        if not song_exists:
+        song_info = self.song_by_name.get(song_name)
+        if song_info is None:
             await interaction.response.send_message(f"Song `{song_name}` not found in library.", delete_after=10)
             return
 
@@ -258,133 +606,97 @@ class MusicCog(commands.Cog):
             await interaction.user.voice.channel.connect()
         await interaction.response.defer()
 
-        # Create music player interface using LayoutView
-        view = LayoutView()
+        # Initialize queues for this guild if they don't exist
+        guild_id = interaction.guild.id
+        if guild_id not in self.priority_queues:
+            self.priority_queues[guild_id] = deque()
+        if guild_id not in self.music_queues:
+            self.music_queues[guild_id] = deque()
 
-        # Get song info from cache
-        song_info = None
-        for song in self.song_cache:
-            if song['display_name'] == song_name:
-                song_info = song
-                break
-
-        if song_info:
-            # Initialize queues for this guild if they don't exist
-            guild_id = interaction.guild.id
-            if guild_id not in self.priority_queues:
-                self.priority_queues[guild_id] = []
-            if guild_id not in self.music_queues:
-                self.music_queues[guild_id] = []
-
-            # Check if something is currently playing
-            is_playing = interaction.guild.voice_client and interaction.guild.voice_client.is_playing()
-
-            if is_playing:
-                # Add to priority queue (user-requested songs get priority)
-                self.priority_queues[guild_id].append(song_info)
-                # Update stats for priority queue addition
-                self.update_song_stats(song_info['file_path'], event_type='queued', queue_type='priority', user_id=str(interaction.user.id))
-                # Calculate position in combined queue (priority songs play first)
-                queue_position = len(self.priority_queues[guild_id])
-
-                # Create queue addition interface using LayoutView
-                view = LayoutView()
-                queue_container = Container()
-
-                # Try to get album art for the queued song
-                album_art = None
-                album_art_file = None
-                # Convert duration in seconds to minutes:seconds for queue display
-                duration_str = "Unknown"
-                try:
-                    audio = MP3(song_info['file_path'])
-                    duration_seconds = int(audio.info.length)
-                    minutes = duration_seconds // 60
-                    seconds = duration_seconds % 60
-                    duration_str = f"{minutes}:{seconds:02d}"
-                except Exception as e:
-                    logger.warning(f"Could not get duration for queue: {e}")
+        # Check if something is currently playing
+        is_playing = interaction.guild.voice_client and interaction.guild.voice_client.is_playing()
 
-                try:
-                    audio = MP3(song_info['file_path'], ID3=ID3)
-                    if 'APIC:' in audio:
-                        album_art_data = audio['APIC:'].data
-                        album_art_file = discord.File(BytesIO(album_art_data), filename="album_art.jpg")
-                        album_art = discord.ui.Thumbnail(media=album_art_file)
-                except Exception as e:
-                    logger.warning(f"Could not extract album art for queue: {e}")
+        if is_playing:
+            # Add to priority queue (user-requested songs get priority)
+            self._enqueue(guild_id, song_info, priority=True)
+            # Update stats for priority queue addition
+            self.update_song_stats(song_info['file_path'], event_type='queued', queue_type='priority', user_id=str(interaction.user.id))
+            # Calculate position in combined queue (priority songs play first)
+            queue_position = len(self.priority_queues[guild_id])
 
-                queue_container.add_item(Section(
-                    TextDisplay(f"🎵 Added to Queue • Position #{queue_position}"),
-                    TextDisplay(f"**{song_info['title']}**"),
-                    TextDisplay(f"👤 {song_info['artist']} ({duration_str})"),
-                    accessory=album_art
-                ))
-                view.add_item(queue_container)
+            # Create queue addition interface using LayoutView
+            view = LayoutView()
+            queue_container = Container()
 
-                # Send the view with album art file if it exists
-                if album_art_file is not None:
-                    await interaction.followup.send(view=view, file=album_art_file)
-                else:
-                    await interaction.followup.send(view=view)
-            else:
-                # Play immediately and ensure we have songs queued
-                self.now_playing[guild_id] = song_info
+            # Try to get album art for the queued song
+            album_art_file, album_art = self._album_art(song_info)
 
-                # Ensure we have at least 3 songs in the regular queue
-                current_regular_count = len(self.music_queues.get(guild_id, []))
-                if current_regular_count < 3:
-                    songs_to_add = 3 - current_regular_count
-                    await self.add_random_songs(guild_id, min_count=songs_to_add)
+            queue_container.add_item(Section(
+                TextDisplay(f"🎵 Added to Queue • Position #{queue_position}"),
+                TextDisplay(f"**{song_info['title']}**"),
+                TextDisplay(f"👤 {song_info['artist']} ({song_info['duration_str']})"),
+                accessory=album_art
+            ))
+            view.add_item(queue_container)
 
-                await self.play_song(interaction, song_info, queue_type='priority', user_id=str(interaction.user.id))
+            # Send the view with album art file if it exists
+            if album_art_file is not None:
+                await interaction.followup.send(view=view, file=album_art_file)
+            else:
+                await interaction.followup.send(view=view)
         else:
-            await interaction.followup.send(f"Could not load song info for: {song_name}")
+            # Play immediately and ensure we have songs queued
+            self._set_now_playing(guild_id, song_info)
+
+            # Ensure we have at least 3 songs in the regular queue
+            if len(self.music_queues.get(guild_id, ())) < 3:
+                await self.add_random_songs(guild_id)
+
+            await self.play_song(interaction, song_info, queue_type='priority', user_id=str(interaction.user.id))
+
+    def _album_art(self, song_info: dict):
+        """Return (discord.File, Thumbnail) for a song's album art, or (None, None) if it has none"""
+        art_path = song_info.get('art_path')
+        if art_path and os.path.exists(art_path):
+            # Let discord.py stream the image from disk instead of holding a copy in memory
+            album_art_file = discord.File(art_path, filename="album_art.jpg")
+            return album_art_file, discord.ui.Thumbnail(media=album_art_file)
+        if 'art_path' in song_info and art_path is None:
+            # The cache scan already found no embedded art
+            return None, None
 
-    async def play_song(self, interaction: discord.Interaction, song_info: dict, send_message: bool = True, queue_type: str = 'regular', user_id: str = None):
-        """Play a song and set up the music interface"""
-        # Try to get album art
-        album_art = None
-        album_art_file = None
-        # Convert duration in seconds to minutes:seconds
-        if 'duration' in song_info and song_info['duration']:
-            minutes = song_info['duration'] // 60
-            seconds = song_info['duration'] % 60
-            song_info['duration_str'] = f"{minutes}:{seconds:02d}"
-        else:
-            song_info['duration_str'] = "Unknown"
         try:
+            # Not cached yet (or the file was removed): extract it once and stream it from disk from now on
             audio = MP3(song_info['file_path'], ID3=ID3)
             if 'APIC:' in audio:
-                album_art_data = audio['APIC:'].data
-                # Create file and send it with the view
-                album_art_file = discord.File(BytesIO(album_art_data), filename="album_art.jpg")
-                album_art = discord.ui.Thumbnail(media=album_art_file)
+                art_path = _write_art(str(ART_DIR), song_info['file_path'], audio['APIC:'].data)
+            else:
+                art_path = None
+            song_info['art_path'] = art_path
+            if art_path is not None:
+                album_art_file = discord.File(art_path, filename="album_art.jpg")
+                return album_art_file, discord.ui.Thumbnail(media=album_art_file)
         except Exception as e:
             logger.warning(f"Could not extract album art: {e}")
+        return None, None
+
+    async def play_song(self, interaction: discord.Interaction, song_info: dict, send_message: bool = True, queue_type: str = 'regular', user_id: str = None):
+        """Play a song and set up the music interface"""
+        # Try to get album art
+        album_art_file, album_art = self._album_art(song_info)
 
         # Update Discord Rich Presence (only for this server)
-        try:
-            activity = discord.Activity(
-                type=discord.ActivityType.listening,
-                name=song_info['title'],
-                details=f"by {song_info['artist']}",
-                state=f"Duration: {song_info['duration_str']}"
-            )
-            await self.bot.change_presence(activity=activity)
-        except discord.Forbidden:
-            # No permission to change presence, skip silently
-            pass
+        activity = discord.Activity(
+            type=discord.ActivityType.listening,
+            name=song_info['title'],
+            details=f"by {song_info['artist']}",
+            state=f"Duration: {song_info['duration_str']}"
+        )
+        self.queue_presence(activity)
 
         # Update voice channel status if bot has permission
-        try:
-            voice_channel = interaction.guild.voice_client.channel
-            if voice_channel.permissions_for(interaction.guild.get_member(self.bot.user.id)).manage_channels:
-                status_text = f"🎵 {song_info['title']} - {song_info['artist']}"
-                await voice_channel.edit(status=status_text)
-        except (discord.Forbidden, AttributeError):
-            # No permission to edit channel status or no voice channel, skip silently
-            pass
+        if interaction.guild.voice_client is not None:
+            await self._set_channel_status(interaction.guild.voice_client.channel, f"🎵 {song_info['title']} - {song_info['artist']}")
 
         # Voice channel monitoring is now handled by event listeners
 
@@ -410,7 +722,7 @@ class MusicCog(commands.Cog):
 
         # Record play start time and update stats for song start
         guild_id = interaction.guild.id
-        self.current_play_start[guild_id] = asyncio.get_event_loop().time()
+        self.current_play_start[guild_id] = time.monotonic()
         self.current_queue_type[guild_id] = queue_type
         self.update_song_stats(song_info['file_path'], event_type='started', queue_type=queue_type, user_id=user_id)
 
@@ -424,7 +736,13 @@ class MusicCog(commands.Cog):
 
         # Play the song
         try:
-            source = discord.FFmpegPCMAudio(str(song_info['file_path']))
+            # Discord voice is Opus: stream a pre-encoded sibling .opus untouched if there is one,
+            # otherwise let FFmpeg encode Opus itself instead of handing PCM to the player thread
+            opus_path = Path(song_info['file_path']).with_suffix('.opus')
+            if opus_path.exists():
+                source = discord.FFmpegOpusAudio(str(opus_path), codec='copy')
+            else:
+                source = discord.FFmpegOpusAudio(str(song_info['file_path']), bitrate=128)
             interaction.guild.voice_client.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(
                 self.on_song_end(interaction), self.bot.loop
             ))
@@ -441,7 +759,7 @@ class MusicCog(commands.Cog):
             # Record play duration for the song that just finished
             if guild_id in self.now_playing and guild_id in self.current_play_start:
                 song_info = self.now_playing[guild_id]
-                play_duration = asyncio.get_event_loop().time() - self.current_play_start[guild_id]
+                play_duration = time.monotonic() - self.current_play_start[guild_id]
 
                 # Always record play duration (even for skipped songs)
                 self.record_play_duration(song_info['file_path'], play_duration)
@@ -457,20 +775,18 @@ class MusicCog(commands.Cog):
 
                     del self.current_play_start[guild_id]
                     # Clear skip flag
-                    if guild_id in self.skip_in_progress:
-                        del self.skip_in_progress[guild_id]
+                    self.skip_in_progress.pop(guild_id, None)
 
             # Clear now playing for this guild since we're disconnected
-            if guild_id in self.now_playing:
-                del self.now_playing[guild_id]
+            self._set_now_playing(guild_id, None)
             # Clear Rich Presence when no music is playing
-            await self.bot.change_presence(activity=None)
+            self.queue_presence(None)
             return
 
         # Record play duration for the song that just finished (always record duration and session)
         if guild_id in self.now_playing and guild_id in self.current_play_start:
             song_info = self.now_playing[guild_id]
-            play_duration = asyncio.get_event_loop().time() - self.current_play_start[guild_id]
+            play_duration = time.monotonic() - self.current_play_start[guild_id]
 
             # Always record play duration and session (even for skipped songs)
             self.record_play_duration(song_info['file_path'], play_duration)
@@ -486,14 +802,12 @@ class MusicCog(commands.Cog):
 
             del self.current_play_start[guild_id]
             # Clear skip flag
-            if guild_id in self.skip_in_progress:
-                del self.skip_in_progress[guild_id]
+            self.skip_in_progress.pop(guild_id, None)
 
         # Check if stop operation is in progress - if so, don't play next song
         if self.stop_in_progress.get(guild_id, False):
             # Clear stop flag since we're handling it now
-            if guild_id in self.stop_in_progress:
-                del self.stop_in_progress[guild_id]
+            self.stop_in_progress.pop(guild_id, None)
             return
 
         # Check loop mode first
@@ -511,30 +825,28 @@ class MusicCog(commands.Cog):
                 current_song = self.now_playing[guild_id]
                 # Initialize queue if needed
                 if guild_id not in self.music_queues:
-                    self.music_queues[guild_id] = []
+                    self.music_queues[guild_id] = deque()
                 # Add current song to end of queue
-                self.music_queues[guild_id].append(current_song)
+                self._enqueue(guild_id, current_song)
 
         # Check priority queue first (user-added songs)
         if guild_id in self.priority_queues and self.priority_queues[guild_id]:
             # Play next priority song
-            next_song = self.priority_queues[guild_id].pop(0)
-            self.now_playing[guild_id] = next_song
+            next_song = self._dequeue(guild_id, priority=True)
+            self._set_now_playing(guild_id, next_song)
             await self.play_song(interaction, next_song, send_message=False, queue_type='priority')
             return
 
         # Check if there are songs in regular queue
         if guild_id in self.music_queues and self.music_queues[guild_id]:
             # Play next song without sending followup message
-            next_song = self.music_queues[guild_id].pop(0)
-            self.now_playing[guild_id] = next_song
+            next_song = self._dequeue(guild_id)
+            self._set_now_playing(guild_id, next_song)
 
             # Check if we need to maintain 3-song minimum after consuming from regular queue
-            current_regular_count = len(self.music_queues.get(guild_id, []))
-            if current_regular_count < 3:
-                songs_to_add = 3 - current_regular_count
+            if len(self.music_queues.get(guild_id, ())) < 3:
                 # Add random songs in background without awaiting
-                asyncio.create_task(self.add_random_songs(guild_id, min_count=songs_to_add))
+                self.request_refill(guild_id)
 
             await self.play_song(interaction, next_song, send_message=False, queue_type='regular')
         else:
@@ -543,22 +855,16 @@ class MusicCog(commands.Cog):
 
             # Try to play from the newly added random songs
             if guild_id in self.music_queues and self.music_queues[guild_id]:
-                next_song = self.music_queues[guild_id].pop(0)
-                self.now_playing[guild_id] = next_song
+                next_song = self._dequeue(guild_id)
+                self._set_now_playing(guild_id, next_song)
                 await self.play_song(interaction, next_song, send_message=False)
             else:
                 # No more songs, clear now playing and disconnect from voice channel
-                if guild_id in self.now_playing:
-                    del self.now_playing[guild_id]
+                self._set_now_playing(guild_id, None)
 
                 # Clear voice channel status if bot has permission
-                try:
-                    voice_channel = interaction.guild.voice_client.channel
-                    if voice_channel.permissions_for(interaction.guild.get_member(self.bot.user.id)).manage_channels:
-                        await voice_channel.edit(status=None)
-                except (discord.Forbidden, AttributeError):
-                    # No permission to edit channel status or no voice channel, skip silently
-                    pass
+                if interaction.guild.voice_client is not None:
+                    await self._set_channel_status(interaction.guild.voice_client.channel, None)
 
                 # Disconnect from voice channel after a short delay
                 if interaction.guild.voice_client:
@@ -567,131 +873,326 @@ class MusicCog(commands.Cog):
                     #logger.info(f"Disconnected from voice channel in guild {guild_id} - no more songs in queue")
 
                 # Clear Rich Presence when no music is playing
-                await self.bot.change_presence(activity=None)
+                self.queue_presence(None)
 
-    async def add_random_songs(self, guild_id: int, min_count: int = 3):
-        """Add up to 3 random songs to the queue"""
-        if not self.song_cache:
+    async def add_random_songs(self, guild_id: int, target_count: int = 3):
+        """Top the regular queue up to target_count songs with random ones"""
+        min_count = target_count - len(self.music_queues.get(guild_id, ()))
+        if not self.song_cache or min_count <= 0:
             return
 
-        import random
-
-        # Get songs not currently in queue or playing
-        available_songs = []
-        current_queue = self.music_queues.get(guild_id, [])
-        priority_queue = self.priority_queues.get(guild_id, [])
-        current_playing = self.now_playing.get(guild_id)
-
-        # Create set of songs already in queues
-        queued_song_paths = set()
-        for song in current_queue + priority_queue:
-            queued_song_paths.add(song['file_path'])
-        if current_playing:
-            queued_song_paths.add(current_playing['file_path'])
-
-        # Filter available songs
-        for song in self.song_cache:
-            if song['file_path'] not in queued_song_paths:
-                available_songs.append(song)
+        # Songs already queued or playing are tracked incrementally per guild
+        queued_song_paths = self._queued_paths.get(guild_id, ())
+
+        # Pick random indices and reject songs already queued, playing or picked;
+        # with a queue much smaller than the library this takes ~min_count draws
+        cache = self.song_cache
+        paths = self._song_paths
+        n = len(paths)
+        random_songs = []
+        seen = set()
+        attempts = 0
+        while len(random_songs) < min_count and attempts < 10 * min_count:
+            attempts += 1
+            i = random.randrange(n)
+            file_path = paths[i]
+            if file_path in queued_song_paths or file_path in seen:
+                continue
+            seen.add(file_path)
+            random_songs.append(cache[i])
+
+        if len(random_songs) < min_count:
+            # Most of the library is queued - sample the remainder from the free indices
+            available = [
+                i for i, file_path in enumerate(paths)
+                if file_path not in queued_song_paths and file_path not in seen
+            ]
+            needed = min(min_count - len(random_songs), len(available))
+            random_songs.extend(cache[i] for i in random.sample(available, needed))
 
-        if not available_songs:
+        if not random_songs:
             return
 
-        # Select up to the minimum count (default 3) or available songs
-        num_to_add = min(min_count, len(available_songs))
-        random_songs = random.sample(available_songs, num_to_add)
-
-        # Mark these songs as random for display purposes
+        # Mark these songs as random for display purposes and add them to the queue
         for song in random_songs:
             song['is_random'] = True
-
-        # Initialize queue if needed
-        if guild_id not in self.music_queues:
-            self.music_queues[guild_id] = []
-
-        # Add random songs to queue
-        self.music_queues[guild_id].extend(random_songs)
+            self._enqueue(guild_id, song)
 
         # Update stats for each randomly added song
         for song in random_songs:
             self.update_song_stats(song['file_path'], event_type='queued', queue_type='regular')
 
+    def request_refill(self, guild_id: int, target_count: int = 3):
+        """Ask the refill worker to top a guild's regular queue up to target_count; requests coalesce per guild"""
+        self._refill_pending[guild_id] = max(target_count, self._refill_pending.get(guild_id, 0))
+        self._refill_event.set()
+
+    async def _refill_loop(self):
+        """Serve refill requests one batch at a time"""
+        while True:
+            await self._refill_event.wait()
+            self._refill_event.clear()
+            pending, self._refill_pending = self._refill_pending, {}
+            for guild_id, target_count in pending.items():
+                try:
+                    # The shortfall is measured when the refill runs, so songs queued meanwhile count
+                    await self.add_random_songs(guild_id, target_count)
+                except Exception as e:
+                    logger.error(f"Failed to refill queue for guild {guild_id}: {e}")
+
+    def _clear_guild_state(self, guild_id: int):
+        """Drop every per-guild entry once the bot has left the guild's voice channel"""
+        self._set_now_playing(guild_id, None)
+        timer = self._alone_timers.get(guild_id)
+        for state in (self.music_queues, self.priority_queues, self.pause_states, self.loop_modes,
+                      self.current_play_start, self.skip_in_progress, self.stop_in_progress,
+                      self.current_queue_type, self._queued_paths, self._alone_timers, self._refill_pending,
+                      self._queue_art, self._queue_render_state):
+            state.pop(guild_id, None)
+
+        # Cancel timers still pending for the guild
+        task = self._timer_tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+        handle = self._presence_handles.pop(guild_id, None)
+        if handle is not None:
+            handle.cancel()
+        if timer is not None and timer.countdown is not None:
+            timer.countdown.cancel()
+            timer.countdown = None
+
+    def _track_path(self, guild_id: int, file_path: str):
+        """Mark a song as queued or playing for a guild"""
+        if guild_id not in self._queued_paths:
+            self._queued_paths[guild_id] = Counter()
+        self._queued_paths[guild_id][file_path] += 1
+
+    def _untrack_path(self, guild_id: int, file_path: str):
+        """Remove one queued/playing reference to a song for a guild"""
+        queued = self._queued_paths.get(guild_id)
+        if queued is None:
+            return
+        queued[file_path] -= 1
+        if queued[file_path] <= 0:
+            del queued[file_path]
+
+    def _enqueue(self, guild_id: int, song_info: dict, priority: bool = False):
+        """Append a song to the priority or regular queue of a guild"""
+        queues = self.priority_queues if priority else self.music_queues
+        if guild_id not in queues:
+            queues[guild_id] = deque()
+        # Songs reaching the queue outside the cache (older cache entries) get their display string here
+        if 'duration_str' not in song_info:
+            song_info['duration_str'] = _format_duration(song_info.get('duration'))
+        queues[guild_id].append(song_info)
+        self._track_path(guild_id, song_info['file_path'])
+
+    def _dequeue(self, guild_id: int, index: int = 0, priority: bool = False) -> dict:
+        """Pop a song from the priority or regular queue of a guild"""
+        queues = self.priority_queues if priority else self.music_queues
+        queue = queues[guild_id]
+        if index == 0:
+            # The playback path always takes the front, which a deque pops in O(1)
+            song_info = queue.popleft()
+        else:
+            # Remove buttons only reach the first few entries
+            song_info = queue[index]
+            del queue[index]
+        self._untrack_path(guild_id, song_info['file_path'])
+        return song_info
+
+    def _clear_queue(self, guild_id: int, priority: bool = False):
+        """Empty the priority or regular queue of a guild"""
+        queues = self.priority_queues if priority else self.music_queues
+        for song_info in queues.get(guild_id, []):
+            self._untrack_path(guild_id, song_info['file_path'])
+        if guild_id in queues:
+            queues[guild_id].clear()
+
+    def _set_now_playing(self, guild_id: int, song_info: dict | None):
+        """Set (or clear with None) the currently playing song of a guild"""
+        previous = self.now_playing.pop(guild_id, None)
+        if previous is not None:
+            self._untrack_path(guild_id, previous['file_path'])
+        if song_info is not None:
+            self.now_playing[guild_id] = song_info
+            self._track_path(guild_id, song_info['file_path'])
+            # Bound the mapping in case a guild's teardown never ran
+            while len(self.now_playing) > self.MAX_GUILDS_NOW_PLAYING:
+                stale_id, stale = self.now_playing.popitem(last=False)
+                self._untrack_path(stale_id, stale['file_path'])
+
+    def _rebuild_indices(self):
+        """Precompute derived per-song fields after the song cache is (re)loaded"""
+        for song in self.song_cache:
+            song['duration_str'] = _format_duration(song.get('duration'))
 
-    def load_song_cache(self):
+        search_keys = [
+            f"{song['title']} {song['artist']} {song['display_name']}".casefold()
+            for song in self.song_cache
+        ]
+        # Bytes substring tests skip the str machinery; UTF-8 keeps non-ASCII matches exact
+        search_keys_b = [key.encode('utf-8', 'surrogatepass') for key in search_keys]
+        self.song_by_name = {song['display_name']: song for song in self.song_cache}
+        self.song_by_path = {song['file_path']: song for song in self.song_cache}
+        song_display = [song['display_name'] for song in self.song_cache]
+
+        # Word-prefix trie for single-word autocomplete queries
+        trie = SongTrie()
+        for index, key in enumerate(search_keys):
+            for word in key.split():
+                trie.insert(word, index)
+
+        # Autocomplete reads these from _io_pool threads: swap them together so a search never
+        # pairs the trie's indices with another library's lists
+        with self._ac_lock:
+            self._search_keys = search_keys
+            self._search_keys_b = search_keys_b
+            self._song_display = song_display
+            self._song_trie = trie
+            self._ac_last = None
+
+        # Column of file paths parallel to song_cache, so sampling and filters skip the dict lookups
+        self._song_paths = [song['file_path'] for song in self.song_cache]
+
+    def _read_song_cache(self):
+        """Read and validate the song cache file (blocking, runs on the I/O pool)"""
+        if not self.CACHE_FILE.exists():
+            return None
+
+        cache_data = _json_loads(self.CACHE_FILE.read_bytes())
+
+        # Check if cache is still valid (no file added, removed or modified since it was built)
+        if cache_data.get('signature') != _library_signature(SONGS_DIR):
+            logger.info("Song files have changed, rebuilding cache")
+            return None
+        return cache_data
+
+    async def load_song_cache(self):
         """Load song cache from file if it exists and is valid"""
-        if self.CACHE_FILE.exists():
-            try:
-                with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-
-                # Check if cache is still valid (files haven't changed)
-                cached_files = set(cache_data.get('files', []))
-                current_files = set(str(f) for f in SONGS_DIR.glob("**/*.mp3"))
-
-                if cached_files == current_files:
-                    self.song_cache = cache_data['songs']
-                    self.cache_timestamp = cache_data.get('timestamp', 0)
-                    logger.info(f"Loaded song cache from file: {len(self.song_cache)} songs")
-                    return True
-                else:
-                    logger.info("Song files have changed, rebuilding cache")
-            except Exception as e:
-                logger.warning(f"Failed to load song cache: {e}")
-
-        return False
-
-    def save_song_cache(self):
-        """Save current song cache to file"""
         try:
-            cache_data = {
-                'songs': self.song_cache,
-                'timestamp': self.cache_timestamp,
-            'files': [str(f) for f in SONGS_DIR.glob("**/*.mp3")]
-            }
+            cache_data = await self._run_io(self._read_song_cache)
+        except Exception as e:
+            logger.warning(f"Failed to load song cache: {e}")
+            return False
+
+        if cache_data is None:
+            return False
+
+        self.song_cache = cache_data['songs']
+        self.cache_timestamp = cache_data.get('timestamp', 0)
+        self.library_signature = cache_data['signature']
+        self._rebuild_indices()
+        logger.info(f"Loaded song cache from file: {len(self.song_cache)} songs")
+        return True
+
+    def _song_cache_payload(self) -> bytes:
+        """Serialize the current song cache"""
+        cache_data = {
+            'songs': self.song_cache,
+            'timestamp': self.cache_timestamp,
+            'signature': self.library_signature,
+        }
+        # Compact orjson output is much faster to write and parse than indented json
+        return _json_dumps(cache_data)
+
+    def _write_song_cache(self, payload: bytes):
+        """Write a serialized song cache to disk (blocking, runs on the I/O pool)"""
+        # Ensure directory exists
+        self.CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        self.CACHE_FILE.write_bytes(payload)
 
-            # Ensure directory exists
-            self.CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    def save_song_cache(self):
+        """Schedule a write of the song cache; saves within CACHE_SAVE_DELAY are collapsed into one"""
+        self._cache_dirty.set()
 
-            with open(self.CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+    async def _cache_flusher(self):
+        """Write the song cache once per burst of save_song_cache calls"""
+        while True:
+            await self._cache_dirty.wait()
+            await asyncio.sleep(self.CACHE_SAVE_DELAY)
 
-            logger.info(f"Saved song cache to file: {len(self.song_cache)} songs")
+            # Clear first so saves requested during the write schedule another one
+            self._cache_dirty.clear()
+            try:
+                # Serialize on the event loop so the snapshot is consistent, then write off the loop
+                payload = self._song_cache_payload()
+                await self._run_io(self._write_song_cache, payload)
 
-            logger.info(f"Saved song cache to file: {len(self.song_cache)} songs")
-        except Exception as e:
-            logger.error(f"Failed to save song cache: {e}")
+                logger.info(f"Saved song cache to file: {len(self.song_cache)} songs")
+            except Exception as e:
+                logger.error(f"Failed to save song cache: {e}")
 
     # Song name autocomplete function
     @play.autocomplete("song_name")
     async def song_name_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
         # Only load from file, don't regenerate cache
         if self.song_cache is None:
-            # Try to load from file
-            if not self.load_song_cache():
-                # If no cache file exists, return empty
-                return []
+            # One load at a time; keystrokes that waited reuse the cache the first one loaded
+            async with self._cache_load_lock:
+                # Try to load from file
+                if self.song_cache is None and not await self.load_song_cache():
+                    # If no cache file exists, return empty
+                    return []
 
         if not self.song_cache:
             return []
 
         def search_current_term(query):
-            songs_data = self.song_cache
-            current_term = query.strip().lower()
+            current_term = query.strip().casefold()
+            with self._ac_lock:
+                display_names = self._song_display
+                search_keys = self._search_keys_b
+                song_trie = self._song_trie
+                last = self._ac_last
 
             if not current_term:
                 # Return first 25 songs with metadata
-                return [song['display_name'] for song in songs_data[:25]]
-
-            results = [
-                song['display_name'] for song in songs_data
-                if current_term in song['title'].lower() or
-                   current_term in song['artist'].lower() or
-                   current_term in song['display_name'].lower()
-            ]
-
-            return results[:25]  # Limit to 25 results as per Discord's limit
-
-        results = await asyncio.to_thread(search_current_term, current)
+                return display_names[:25]
+
+            # Typing extends the previous query: when that query matched less than a page,
+            # every match of this one is among its matches, so filter those instead of the library
+            candidates = None
+            if last is not None and last[2] is search_keys and current_term.startswith(last[0]):
+                candidates = last[1]
+
+            indices = []
+            term_b = current_term.encode('utf-8', 'surrogatepass')
+            tokens = term_b.split()
+            if len(tokens) > 1:
+                # Multi-word query: every word must appear somewhere, in any order
+                pattern = re.compile(b"".join(b"(?=.*" + re.escape(token) + b")" for token in tokens), re.DOTALL)
+                for i in (candidates if candidates is not None else range(len(search_keys))):
+                    if pattern.search(search_keys[i]):
+                        indices.append(i)
+                        if len(indices) == 25:
+                            break
+            else:
+                # Songs with a word starting with the query come straight from the trie
+                hits = song_trie.search(current_term)[:25]
+                indices = list(hits)
+                if len(indices) < 25:
+                    # Fewer than a page of prefix hits: fill up with substring matches inside words.
+                    # A single word can't span the separators, so testing the joined casefolded key
+                    # is the same as testing title, artist and display name one by one.
+                    # Refining scans the previous matches in library order, so the result is the
+                    # same as a fresh query's
+                    hit_set = set(hits)
+                    for i in (candidates if candidates is not None else range(len(search_keys))):
+                        if term_b in search_keys[i] and i not in hit_set:
+                            indices.append(i)
+                            # Limit to 25 results as per Discord's limit
+                            if len(indices) == 25:
+                                break
+
+            if len(indices) < 25:
+                # Complete match list, reusable by the next keystroke; kept in library order
+                # because the trie hits lead the page
+                with self._ac_lock:
+                    self._ac_last = (current_term, sorted(indices), search_keys)
+            return [display_names[i] for i in indices]
+
+        results = await self._run_io(search_current_term, current)
 
         valid_choices = [
             app_commands.Choice(name=item[:100], value=item[:100])
@@ -717,489 +1218,296 @@ class MusicCog(commands.Cog):
             await message.delete(delay=10)
             return
 
-        # Create music player interface using LayoutView
-        view = LayoutView()
-
-        # Create container for the queue display
-        full_container = Container()
-
-        # Check if there's a current song playing
-        if guild_id in self.now_playing:
-            song_info = self.now_playing[guild_id]
-
-            # Try to get album art
-            album_art = None
-            album_art_file = None
-            try:
-                audio = MP3(song_info['file_path'], ID3=ID3)
-                if 'APIC:' in audio:
-                    album_art_data = audio['APIC:'].data
-                    album_art_file = discord.File(BytesIO(album_art_data), filename="album_art.jpg")
-                    album_art = discord.ui.Thumbnail(media=album_art_file)
-            except Exception as e:
-                logger.warning(f"Could not extract album art: {e}")
-
-            # Add now playing section
-            full_container.add_item(Section(
-                TextDisplay(f"# 🎵 Now Playing 🎵"),
-                TextDisplay(f"### {song_info['title']}"),
-                TextDisplay(f"👤 {song_info['artist']} ({song_info.get('duration_str', 'Unknown')})"),
-                accessory=album_art
-            ))
-
-        view.add_item(full_container)
-
-        full_container.add_item(Separator())
-
-        # If priority queue is large, show only priority queue to avoid UI limits
-        if priority_count > 3:
-            # Show only priority queue when it's large
-            full_container.add_item(TextDisplay(f"### ⭐ Priority Queue: ({priority_count})"))
-            priority_to_show = min(6, priority_count)  # Show up to 6 priority items
-
-            for i, song in enumerate(self.priority_queues[guild_id][:priority_to_show], 1):
-                # Format duration for display
-                if 'duration' in song and song['duration']:
-                    minutes = song['duration'] // 60
-                    seconds = song['duration'] % 60
-                    duration_str = f"{minutes}:{seconds:02d}"
-                else:
-                    duration_str = "Unknown"
-                full_container.add_item(Section(
-                    TextDisplay(f"{i}. **{song['title']}**"),
-                    TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                    accessory=discord.ui.Button(
-                        style=discord.ButtonStyle.secondary,
-                        label="Remove",
-                        custom_id=f"remove_priority_{guild_id}_{i-1}",
-                    )
-                ))
-
-            if priority_count > priority_to_show:
-                full_container.add_item(TextDisplay(f"⭐ ... and {priority_count - priority_to_show} more priority songs"))
-
-            # Don't show regular queue when priority is large
-            if regular_count > 0:
-                full_container.add_item(TextDisplay(f"🎲 {regular_count} regular songs queued after priority"))
-        else:
-            # Show both queues when priority is small
-            # Limit display to avoid hitting 40 child limit
-            max_sections = 8  # Stay well under 40 total children
-            sections_used = 0
-
-            # Show priority queue items first (prioritize these)
-            if priority_count > 0 and sections_used < max_sections:
-                full_container.add_item(TextDisplay(f"### ⭐ Priority Queue: ({priority_count})"))
-                priority_to_show = min(3, priority_count, max_sections - sections_used)
-
-                for i, song in enumerate(self.priority_queues[guild_id][:priority_to_show], 1):
-                    # Format duration for display
-                    if 'duration' in song and song['duration']:
-                        minutes = song['duration'] // 60
-                        seconds = song['duration'] % 60
-                        duration_str = f"{minutes}:{seconds:02d}"
-                    else:
-                        duration_str = "Unknown"
-                    full_container.add_item(Section(
-                        TextDisplay(f"{i}. **{song['title']}**"),
-                        TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                        accessory=discord.ui.Button(
-                            style=discord.ButtonStyle.secondary,
-                            label="Remove",
-                            custom_id=f"remove_priority_{guild_id}_{i-1}",
-                        )
-                    ))
-                    sections_used += 1
-
-                if priority_count > priority_to_show:
-                    full_container.add_item(TextDisplay(f"⭐ ... and {priority_count - priority_to_show} more priority songs"))
-
-            # Show regular queue items only if we have space
-            if regular_count > 0 and sections_used < max_sections:
-                remaining_slots = max_sections - sections_used
-                if priority_count > 0:
-                    full_container.add_item(Separator(visible=False))
-                full_container.add_item(TextDisplay(f"### 🎲 Regular Queue: ({regular_count})"))
-
-                # Calculate starting index for regular queue display
-                start_index = 1
-                if priority_count > 0:
-                    start_index = priority_count + 1
-
-                # Show remaining available slots for regular queue
-                regular_to_show = min(remaining_slots, regular_count)
-                regular_display = self.music_queues[guild_id][:regular_to_show]
-
-                for i, song in enumerate(regular_display, start_index):
-                    # Format duration for display
-                    if 'duration' in song and song['duration']:
-                        minutes = song['duration'] // 60
-                        seconds = song['duration'] % 60
-                        duration_str = f"{minutes}:{seconds:02d}"
-                    else:
-                        duration_str = "Unknown"
-                    full_container.add_item(Section(
-                        TextDisplay(f"{i}. **{song['title']}**"),
-                        TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                        accessory=discord.ui.Button(
-                            style=discord.ButtonStyle.secondary,
-                            label="Remove",
-                            custom_id=f"remove_regular_{guild_id}_{i-start_index}",
-                        )
-                    ))
-
-                remaining_regular = regular_count - len(regular_display)
-                if remaining_regular > 0:
-                    full_container.add_item(TextDisplay(f"➡️ ... and {remaining_regular} more songs"))
-
-        # Determine pause/resume button state
-        is_paused = self.pause_states.get(guild_id, False)
-        pause_label = "Resume" if is_paused else "Pause"
-        pause_emoji = "▶️" if is_paused else "⏸️"
-
-        # Determine loop button state
-        current_loop_mode = self.loop_modes.get(guild_id, 'off')
-        if current_loop_mode == 'off':
-            loop_label = "Loop: Off"
-            loop_emoji = "🔁"
-            loop_style = discord.ButtonStyle.secondary
-        elif current_loop_mode == 'single':
-            loop_label = "Loop: Single"
-            loop_emoji = "🔂"
-            loop_style = discord.ButtonStyle.primary
-        elif current_loop_mode == 'queue':
-            loop_label = "Loop: Queue"
-            loop_emoji = "🔁"
-            loop_style = discord.ButtonStyle.primary
-
-        # Add control buttons container
-        control_container = Container(
-            ActionRow(
-                discord.ui.Button(
-                    style=discord.ButtonStyle.secondary,
-                    label=pause_label,
-                    emoji=pause_emoji,
-                    custom_id=f"queue_pause_{guild_id}",
-                ),
-                discord.ui.Button(
-                    style=discord.ButtonStyle.primary,
-                    label="Skip",
-                    emoji="⏭️",
-                    custom_id=f"queue_skip_{guild_id}",
-                ),
-                discord.ui.Button(
-                    style=loop_style,
-                    label=loop_label,
-                    emoji=loop_emoji,
-                    custom_id=f"queue_loop_{guild_id}",
-                ),
-                discord.ui.Button(
-                    style=discord.ButtonStyle.secondary,
-                    label="Clear Queue",
-                    emoji="🧹",
-                    custom_id=f"queue_clear_{guild_id}",
-                ),
-                discord.ui.Button(
-                    style=discord.ButtonStyle.danger,
-                    label="Stop",
-                    emoji="⏹️",
-                    custom_id=f"queue_stop_{guild_id}",
-                ),
-            ),
-        )
-        view.add_item(control_container)
+        view, album_art_file, art_song = self._build_queue_view(guild_id)
 
         # Send the view with album art file if it exists
-        if 'album_art_file' in locals() and album_art_file is not None:
-            await interaction.followup.send(view=view, file=album_art_file)
+        if album_art_file is not None:
+            message = await interaction.followup.send(view=view, file=album_art_file, wait=True)
+            # The song the art was rendered for, playback may have moved on during the send
+            self._queue_art[guild_id] = (message.id, art_song)
         else:
             await interaction.followup.send(view=view)
 
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
         """Handle button interactions for queue management"""
-        if interaction.type == discord.InteractionType.component:
-            custom_id = interaction.data.get('custom_id', '')
-            if custom_id.startswith('remove_'):
-                await self.handle_remove_button(interaction, custom_id)
-            elif custom_id.startswith('queue_'):
-                await self.handle_queue_button(interaction, custom_id)
-            elif custom_id.startswith('play_again_'):
-                await self.handle_play_again_button(interaction, custom_id)
+        if interaction.type != discord.InteractionType.component:
+            return
+        custom_id = interaction.data.get('custom_id', '')
+        # One lookup routes the interaction; components of other cogs fall through untouched
+        handler = self._button_handlers.get(custom_id.partition('_')[0])
+        if handler is not None:
+            await handler(interaction, custom_id)
 
     async def handle_remove_button(self, interaction: discord.Interaction, custom_id: str):
         """Handle remove button clicks"""
         # Parse custom_id format: remove_{queue_type}_{guild_id}_{index}
-        parts = custom_id.split('_')
-        if len(parts) != 4:
+        match = _REMOVE_ID_RE.fullmatch(custom_id)
+        if match is None:
             return
+        queue_type = match[1]
+        guild_id = int(match[2])
+        index = int(match[3])
 
-        _, queue_type, guild_id_str, index_str = parts
-        try:
-            guild_id = int(guild_id_str)
-            index = int(index_str)
-        except ValueError:
-            return
+        queue = (self.priority_queues if queue_type == 'priority' else self.music_queues).get(guild_id)
 
+        # Validate everything before deferring, error replies still go through the initial response
         # Check if user has permission (in voice channel)
-        if not interaction.user.voice or interaction.user.voice.channel != interaction.guild.voice_client.channel:
+        voice_client = interaction.guild.voice_client
+        if not interaction.user.voice or voice_client is None or interaction.user.voice.channel != voice_client.channel:
             await interaction.response.send_message("You must be in the voice channel to manage the queue.", ephemeral=True)
             return
 
+        if queue is None or not 0 <= index < len(queue):
+            await interaction.response.send_message(f"Song not found in {queue_type} queue.", ephemeral=True)
+            return
+
         # Defer the interaction to prevent timeout
         await interaction.response.defer()
 
         # Remove the song from the appropriate queue
-        if queue_type == 'priority':
-            if guild_id in self.priority_queues and index < len(self.priority_queues[guild_id]):
-                removed_song = self.priority_queues[guild_id].pop(index)
-                # Update the queue message with new view
-                await self.update_queue_message(interaction)
-            else:
-                await interaction.response.send_message("Song not found in priority queue.", ephemeral=True)
-        elif queue_type == 'regular':
-            if guild_id in self.music_queues and index < len(self.music_queues[guild_id]):
-                removed_song = self.music_queues[guild_id].pop(index)
-
-                # Check if we need to add more songs to maintain 3-song minimum
-                current_regular_count = len(self.music_queues.get(guild_id, []))
-                if current_regular_count < 3:
-                    songs_to_add = 3 - current_regular_count
-                    # Add random songs and wait for completion
-                    await self.add_random_songs(guild_id, min_count=songs_to_add)
-
-                # Update the queue message with new view after songs are added
-                await self.update_queue_message(interaction)
-            else:
-                await interaction.response.send_message("Song not found in regular queue.", ephemeral=True)
+        self._dequeue(guild_id, index, priority=queue_type == 'priority')
+
+        if queue_type == 'regular':
+            # Check if we need to add more songs to maintain 3-song minimum
+            if len(self.music_queues.get(guild_id, ())) < 3:
+                # Add random songs and wait for completion
+                await self.add_random_songs(guild_id)
+
+        # Update the queue message with new view (after songs are added)
+        await self.update_queue_message(interaction)
 
     async def handle_queue_button(self, interaction: discord.Interaction, custom_id: str):
         """Handle queue control button clicks"""
         # Parse custom_id format: queue_{action}_{guild_id}
-        parts = custom_id.split('_')
-        if len(parts) != 3:
-            return
-
-        _, action, guild_id_str = parts
+        action, _, guild_id_str = custom_id[len('queue_'):].partition('_')
         try:
             guild_id = int(guild_id_str)
         except ValueError:
             return
 
+        handler = self._queue_actions.get(action)
+        if handler is None:
+            return
+
         # Check if user has permission (in voice channel)
-        if not interaction.user.voice or interaction.user.voice.channel != interaction.guild.voice_client.channel:
+        voice_client = interaction.guild.voice_client
+        if not interaction.user.voice or voice_client is None or interaction.user.voice.channel != voice_client.channel:
             await interaction.response.send_message("You must be in the voice channel to control music.", ephemeral=True)
             return
 
-        # Defer the interaction to prevent timeout
+        # Defer the interaction to prevent timeout; the actions reply to errors with ephemeral followups
         await interaction.response.defer()
+        await handler(interaction, guild_id)
 
-        if action == 'skip':
-            # Same logic as skip command
-            if interaction.guild.voice_client is None:
-                await interaction.response.send_message("I'm not currently playing music.", ephemeral=True)
-                return
-
-            if not interaction.guild.voice_client.is_playing():
-                await interaction.response.send_message("No song is currently playing.", ephemeral=True)
-                return
-
-            # Mark as skip in progress (on_song_end will handle the stats recording)
-            self.skip_in_progress[guild_id] = True
+    async def _queue_action_skip(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Skip the current song"""
+        # Same logic as skip command
+        if interaction.guild.voice_client is None:
+            await interaction.followup.send("I'm not currently playing music.", ephemeral=True)
+            return
 
-            # Stop current song (this will trigger on_song_end)
-            interaction.guild.voice_client.stop()
+        if not interaction.guild.voice_client.is_playing():
+            await interaction.followup.send("No song is currently playing.", ephemeral=True)
+            return
 
-            # Ensure we maintain 3 songs in regular queue after skip
-            current_regular_count = len(self.music_queues.get(guild_id, []))
-            if current_regular_count < 3:
-                songs_to_add = 3 - current_regular_count
-                # Add random songs in background without awaiting
-                asyncio.create_task(self.add_random_songs(guild_id, min_count=songs_to_add))
+        # Mark as skip in progress (on_song_end will handle the stats recording)
+        self.skip_in_progress[guild_id] = True
 
-            # Wait a moment for the song transition to complete
-            await asyncio.sleep(0.5)
+        # Stop current song (this will trigger on_song_end)
+        interaction.guild.voice_client.stop()
 
-            # Update the queue message with new view
-            await self.update_queue_message(interaction)
+        # Ensure we maintain 3 songs in regular queue after skip
+        if len(self.music_queues.get(guild_id, ())) < 3:
+            # Add random songs in background without awaiting
+            self.request_refill(guild_id)
 
-        elif action == 'stop':
-            # Set stop flag to prevent on_song_end from playing next song
-            self.stop_in_progress[guild_id] = True
+        # Wait a moment for the song transition to complete
+        await asyncio.sleep(0.5)
 
-            # Record play duration for currently playing song before stopping
-            if guild_id in self.now_playing and guild_id in self.current_play_start:
-                song_info = self.now_playing[guild_id]
-                play_duration = asyncio.get_event_loop().time() - self.current_play_start[guild_id]
+        # Update the queue message with new view
+        await self.update_queue_message(interaction)
 
-                # Always record play duration and session (even for stopped songs)
-                self.record_play_duration(song_info['file_path'], play_duration)
+    async def _queue_action_stop(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Stop playback, clear the queues and disconnect"""
+        # Set stop flag to prevent on_song_end from playing next song
+        self.stop_in_progress[guild_id] = True
 
-                # Record appropriate event type - treat stop as a special case
-                current_type = self.current_queue_type.get(guild_id, 'regular')
-                # For stop, we don't count it as completed or skipped, but we record the duration
-                # This is a new event type we might want to track separately
+        # Record play duration for currently playing song before stopping
+        if guild_id in self.now_playing and guild_id in self.current_play_start:
+            song_info = self.now_playing[guild_id]
+            play_duration = time.monotonic() - self.current_play_start[guild_id]
 
-                del self.current_play_start[guild_id]
+            # Always record play duration and session (even for stopped songs)
+            self.record_play_duration(song_info['file_path'], play_duration)
 
-            # Clear all queues and disconnect
-            if guild_id in self.priority_queues:
-                del self.priority_queues[guild_id]
-            if guild_id in self.music_queues:
-                del self.music_queues[guild_id]
-            if guild_id in self.now_playing:
-                del self.now_playing[guild_id]
+            # A stop is neither completed nor skipped, so only the duration is recorded
+            del self.current_play_start[guild_id]
 
-            # Clear voice channel status if bot has permission
-            try:
-                voice_channel = interaction.guild.voice_client.channel
-                if voice_channel.permissions_for(interaction.guild.get_member(self.bot.user.id)).manage_channels:
-                    await voice_channel.edit(status=None)
-            except (discord.Forbidden, AttributeError):
-                # No permission to edit channel status or no voice channel, skip silently
-                pass
+        # Clear all queues and per-guild state in one pass, then disconnect.
+        # That also drops the stop flag, which has to stay set until the disconnect is done
+        self._clear_guild_state(guild_id)
+        self.stop_in_progress[guild_id] = True
 
-            # Stop current song and disconnect
-            if interaction.guild.voice_client:
-                if interaction.guild.voice_client.is_playing():
-                    interaction.guild.voice_client.stop()
-                await asyncio.sleep(0.5)  # Brief pause before disconnecting
-                await interaction.guild.voice_client.disconnect()
+        # Clear voice channel status if bot has permission
+        if interaction.guild.voice_client is not None:
+            await self._set_channel_status(interaction.guild.voice_client.channel, None)
 
-            # Clear Rich Presence
-            await self.bot.change_presence(activity=None)
+        # Stop current song and disconnect
+        if interaction.guild.voice_client:
+            if interaction.guild.voice_client.is_playing():
+                interaction.guild.voice_client.stop()
+            await asyncio.sleep(0.5)  # Brief pause before disconnecting
+            await interaction.guild.voice_client.disconnect()
 
-            # Clear stop flag after disconnect
-            if guild_id in self.stop_in_progress:
-                del self.stop_in_progress[guild_id]
+        # Clear Rich Presence
+        self.queue_presence(None)
 
-            # Create a stopped message with no buttons
-            view = LayoutView()
-            stopped_container = Container()
-            stopped_container.add_item(Section(
-                TextDisplay("⏹️ **Music Stopped**"),
-                TextDisplay("All queues cleared and disconnected from voice channel."),
-                TextDisplay("-# Use `/play` to start playing music again"),
-                accessory=discord.ui.Button(
-                    style=discord.ButtonStyle.primary,
-                    label="Play Again",
-                    emoji="▶️",
-                    custom_id=f"play_again_{guild_id}",
-                )
-            ))
-            view.add_item(stopped_container)
+        # Clear stop flag after disconnect
+        self.stop_in_progress.pop(guild_id, None)
 
-            # Update the message with stopped state (no action row)
-            try:
-                await interaction.message.edit(view=view)
-            except Exception as e:
-                logger.warning(f"Could not update stop message: {e}")
-                await interaction.followup.send(view=view, ephemeral=True)
+        # Create a stopped message with no buttons
+        view = LayoutView()
+        stopped_container = Container()
+        stopped_container.add_item(Section(
+            TextDisplay("⏹️ **Music Stopped**"),
+            TextDisplay("All queues cleared and disconnected from voice channel."),
+            TextDisplay("-# Use `/play` to start playing music again"),
+            accessory=discord.ui.Button(
+                style=discord.ButtonStyle.primary,
+                label="Play Again",
+                emoji="▶️",
+                custom_id=f"play_again_{guild_id}",
+            )
+        ))
+        view.add_item(stopped_container)
 
-        elif action == 'pause':
-            # Toggle pause/resume
-            if interaction.guild.voice_client:
-                if interaction.guild.voice_client.is_playing():
-                    interaction.guild.voice_client.pause()
-                    self.pause_states[guild_id] = True
-                    # Update the queue message with paused state
-                    await self.update_queue_message(interaction)
-                elif interaction.guild.voice_client.is_paused():
-                    interaction.guild.voice_client.resume()
-                    self.pause_states[guild_id] = False
-                    # Update the queue message with resumed state
-                    await self.update_queue_message(interaction)
-                else:
-                    await interaction.response.send_message("No song is currently playing.", ephemeral=True)
+        # Update the message with stopped state (no action row)
+        try:
+            await interaction.message.edit(view=view)
+        except Exception as e:
+            logger.warning(f"Could not update stop message: {e}")
+            await interaction.followup.send(view=view, ephemeral=True)
+
+    async def _queue_action_pause(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Toggle pause/resume"""
+        # Toggle pause/resume
+        if interaction.guild.voice_client:
+            if interaction.guild.voice_client.is_playing():
+                interaction.guild.voice_client.pause()
+                self.pause_states[guild_id] = True
+                # Update the queue message with paused state
+                await self.update_queue_message(interaction)
+            elif interaction.guild.voice_client.is_paused():
+                interaction.guild.voice_client.resume()
+                self.pause_states[guild_id] = False
+                # Update the queue message with resumed state
+                await self.update_queue_message(interaction)
             else:
-                await interaction.response.send_message("I'm not currently playing music.", ephemeral=True)
-
-        elif action == 'loop':
-            # Cycle through loop modes: off -> single -> queue -> off
-            current_mode = self.loop_modes.get(guild_id, 'off')
-            if current_mode == 'off':
-                self.loop_modes[guild_id] = 'single'
-            elif current_mode == 'single':
-                self.loop_modes[guild_id] = 'queue'
-            elif current_mode == 'queue':
-                self.loop_modes[guild_id] = 'off'
-            # Update the queue message to show new loop mode
-            await self.update_queue_message(interaction)
+                await interaction.followup.send("No song is currently playing.", ephemeral=True)
+        else:
+            await interaction.followup.send("I'm not currently playing music.", ephemeral=True)
+
+    async def _queue_action_loop(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Cycle the loop mode"""
+        # Cycle through loop modes: off -> single -> queue -> off
+        current_mode = self.loop_modes.get(guild_id, 'off')
+        if current_mode == 'off':
+            self.loop_modes[guild_id] = 'single'
+        elif current_mode == 'single':
+            self.loop_modes[guild_id] = 'queue'
+        elif current_mode == 'queue':
+            self.loop_modes[guild_id] = 'off'
+        # Update the queue message to show new loop mode
+        await self.update_queue_message(interaction)
+
+    async def _queue_action_clear(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Clear both queues and refill the regular one"""
+        # Record play duration for currently playing song before clearing queues
+        if guild_id in self.now_playing and guild_id in self.current_play_start:
+            song_info = self.now_playing[guild_id]
+            play_duration = time.monotonic() - self.current_play_start[guild_id]
 
-        elif action == 'clear':
-            # Record play duration for currently playing song before clearing queues
-            if guild_id in self.now_playing and guild_id in self.current_play_start:
-                song_info = self.now_playing[guild_id]
-                play_duration = asyncio.get_event_loop().time() - self.current_play_start[guild_id]
+            # Always record play duration and session (even for cleared songs)
+            self.record_play_duration(song_info['file_path'], play_duration)
 
-                # Always record play duration and session (even for cleared songs)
-                self.record_play_duration(song_info['file_path'], play_duration)
+            # A clear is neither completed nor skipped, so only the duration is recorded
+            del self.current_play_start[guild_id]
 
-                # Record appropriate event type - treat clear as a special case
-                current_type = self.current_queue_type.get(guild_id, 'regular')
-                # For clear, we don't count it as completed or skipped, but we record the duration
-                # This is a new event type we might want to track separately
-
-                del self.current_play_start[guild_id]
-
-            # Clear all songs from both priority and regular queues
-            cleared_anything = False
-            if guild_id in self.priority_queues:
-                self.priority_queues[guild_id].clear()
-                cleared_anything = True
-            if guild_id in self.music_queues:
-                self.music_queues[guild_id].clear()
-                cleared_anything = True
-
-            if cleared_anything:
-                # Add back 3 random songs to maintain minimum
-                await self.add_random_songs(guild_id, min_count=3)
-                # Update the queue message with cleared state
-                await self.update_queue_message(interaction)
-            else:
-                await interaction.response.send_message("No songs in queue to clear.", ephemeral=True)
+        # Clear all songs from both priority and regular queues
+        cleared_anything = False
+        if guild_id in self.priority_queues:
+            self._clear_queue(guild_id, priority=True)
+            cleared_anything = True
+        if guild_id in self.music_queues:
+            self._clear_queue(guild_id)
+            cleared_anything = True
+
+        if cleared_anything:
+            # Add back 3 random songs to maintain minimum
+            await self.add_random_songs(guild_id)
+            # Update the queue message with cleared state
+            await self.update_queue_message(interaction)
+        else:
+            await interaction.followup.send("No songs in queue to clear.", ephemeral=True)
 
-        elif action == 'shuffle':
-            # Shuffle the regular queue
-            if guild_id in self.music_queues and self.music_queues[guild_id]:
-                import random
-                random.shuffle(self.music_queues[guild_id])
-                # Update the queue message with shuffled view
-                await self.update_queue_message(interaction)
-            else:
-                await interaction.response.send_message("No songs in regular queue to shuffle.", ephemeral=True)
+    async def _queue_action_shuffle(self, interaction: discord.Interaction, guild_id: int):
+        """Queue button: Shuffle the regular queue"""
+        # Shuffle the regular queue
+        if guild_id in self.music_queues and self.music_queues[guild_id]:
+            queue = self.music_queues[guild_id]
+            # Shuffle a list copy: deque indexing makes an in-place shuffle O(n^2) on big queues,
+            # while the copy is linear and nothing can change the queue between the two steps
+            songs = list(queue)
+            random.shuffle(songs)
+            queue.clear()
+            queue.extend(songs)
+            # Update the queue message with shuffled view
+            await self.update_queue_message(interaction)
+        else:
+            await interaction.followup.send("No songs in regular queue to shuffle.", ephemeral=True)
+
+    def _queue_row(self, position: int, song: dict, custom_id: str) -> Section:
+        """One queue entry with its Remove button"""
+        return Section(
+            TextDisplay(f"{position}. **{song['title']}**\n-# {song['artist']} ({song.get('duration_str', 'Unknown')})"),
+            accessory=discord.ui.Button(
+                style=discord.ButtonStyle.secondary,
+                label="Remove",
+                custom_id=custom_id,
+            )
+        )
 
-    async def update_queue_message(self, interaction: discord.Interaction):
-        """Update the queue message with current state"""
-        guild_id = interaction.guild.id
+    def _build_queue_view(self, guild_id: int, attached_art: str | None = None) -> tuple[LayoutView, discord.File | None, str | None]:
+        """Build the queue interface of a guild, returning the view, the album art file to attach
+        and the file_path of the song that art belongs to (None when there is no file to attach)
 
-        # Create updated music player interface using LayoutView
+        attached_art is the file_path of the song whose album art the edited message already carries
+        """
+        # Create music player interface using LayoutView
         view = LayoutView()
 
         # Create container for the queue display
         full_container = Container()
 
         # Check if there's a current song playing
+        album_art_file = None
+        art_song = None
         if guild_id in self.now_playing:
             song_info = self.now_playing[guild_id]
 
-            # Try to get album art
-            album_art = None
-            album_art_file = None
-            try:
-                audio = MP3(song_info['file_path'], ID3=ID3)
-                if 'APIC:' in audio:
-                    album_art_data = audio['APIC:'].data
-                    album_art_file = discord.File(BytesIO(album_art_data), filename="album_art.jpg")
-                    album_art = discord.ui.Thumbnail(media=album_art_file)
-            except Exception as e:
-                logger.warning(f"Could not extract album art: {e}")
+            if attached_art == song_info['file_path'] and song_info.get('art_path'):
+                # Same song as when the message was sent: point at its attachment instead of uploading again
+                album_art = discord.ui.Thumbnail(media="attachment://album_art.jpg")
+            else:
+                # Try to get album art
+                album_art_file, album_art = self._album_art(song_info)
+                if album_art_file is not None:
+                    art_song = song_info['file_path']
 
             # Add now playing section
             full_container.add_item(Section(
-                TextDisplay(f"# 🎵 Now Playing 🎵"),
-                TextDisplay(f"### {song_info['title']}"),
-                TextDisplay(f"👤 {song_info['artist']} ({song_info.get('duration_str', 'Unknown')})"),
+                TextDisplay(f"# 🎵 Now Playing 🎵\n### {song_info['title']}\n👤 {song_info['artist']} ({song_info.get('duration_str', 'Unknown')})"),
                 accessory=album_art
             ))
 
@@ -1219,23 +1527,8 @@ class MusicCog(commands.Cog):
                 full_container.add_item(TextDisplay(f"### ⭐ Priority Queue: ({priority_count})"))
                 priority_to_show = min(6, priority_count)  # Show up to 6 priority items
 
-                for i, song in enumerate(self.priority_queues[guild_id][:priority_to_show], 1):
-                    # Format duration for display
-                    if 'duration' in song and song['duration']:
-                        minutes = song['duration'] // 60
-                        seconds = song['duration'] % 60
-                        duration_str = f"{minutes}:{seconds:02d}"
-                    else:
-                        duration_str = "Unknown"
-                    full_container.add_item(Section(
-                        TextDisplay(f"{i}. **{song['title']}**"),
-                        TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                        accessory=discord.ui.Button(
-                            style=discord.ButtonStyle.secondary,
-                            label="Remove",
-                            custom_id=f"remove_priority_{guild_id}_{i-1}",
-                        )
-                    ))
+                for i, song in enumerate(islice(self.priority_queues[guild_id], priority_to_show), 1):
+                    full_container.add_item(self._queue_row(i, song, f"remove_priority_{guild_id}_{i-1}"))
 
                 if priority_count > priority_to_show:
                     full_container.add_item(TextDisplay(f"⭐ ... and {priority_count - priority_to_show} more priority songs"))
@@ -1254,23 +1547,8 @@ class MusicCog(commands.Cog):
                     full_container.add_item(TextDisplay(f"### ⭐ Priority Queue: ({priority_count})"))
                     priority_to_show = min(3, priority_count, max_sections - sections_used)
 
-                    for i, song in enumerate(self.priority_queues[guild_id][:priority_to_show], 1):
-                        # Format duration for display
-                        if 'duration' in song and song['duration']:
-                            minutes = song['duration'] // 60
-                            seconds = song['duration'] % 60
-                            duration_str = f"{minutes}:{seconds:02d}"
-                        else:
-                            duration_str = "Unknown"
-                        full_container.add_item(Section(
-                            TextDisplay(f"{i}. **{song['title']}**"),
-                            TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                            accessory=discord.ui.Button(
-                                style=discord.ButtonStyle.secondary,
-                                label="Remove",
-                                custom_id=f"remove_priority_{guild_id}_{i-1}",
-                            )
-                        ))
+                    for i, song in enumerate(islice(self.priority_queues[guild_id], priority_to_show), 1):
+                        full_container.add_item(self._queue_row(i, song, f"remove_priority_{guild_id}_{i-1}"))
                         sections_used += 1
 
                     if priority_count > priority_to_show:
@@ -1290,25 +1568,10 @@ class MusicCog(commands.Cog):
 
                     # Show remaining available slots for regular queue
                     regular_to_show = min(remaining_slots, regular_count)
-                    regular_display = self.music_queues[guild_id][:regular_to_show]
+                    regular_display = list(islice(self.music_queues[guild_id], regular_to_show))
 
                     for i, song in enumerate(regular_display, start_index):
-                        # Format duration for display
-                        if 'duration' in song and song['duration']:
-                            minutes = song['duration'] // 60
-                            seconds = song['duration'] % 60
-                            duration_str = f"{minutes}:{seconds:02d}"
-                        else:
-                            duration_str = "Unknown"
-                        full_container.add_item(Section(
-                            TextDisplay(f"{i}. **{song['title']}**"),
-                            TextDisplay(f"-# {song['artist']} ({duration_str})"),
-                            accessory=discord.ui.Button(
-                                style=discord.ButtonStyle.secondary,
-                                label="Remove",
-                                custom_id=f"remove_regular_{guild_id}_{i-start_index}",
-                            )
-                        ))
+                        full_container.add_item(self._queue_row(i, song, f"remove_regular_{guild_id}_{i-start_index}"))
 
                     remaining_regular = regular_count - len(regular_display)
                     if remaining_regular > 0:
@@ -1316,25 +1579,9 @@ class MusicCog(commands.Cog):
         else:
             full_container.add_item(TextDisplay("No songs in queue"))
 
-        # Determine pause/resume button state
-        is_paused = self.pause_states.get(guild_id, False)
-        pause_label = "Resume" if is_paused else "Pause"
-        pause_emoji = "▶️" if is_paused else "⏸️"
-
-        # Determine loop button state
-        current_loop_mode = self.loop_modes.get(guild_id, 'off')
-        if current_loop_mode == 'off':
-            loop_label = "Loop: Off"
-            loop_emoji = "🔁"
-            loop_style = discord.ButtonStyle.secondary
-        elif current_loop_mode == 'single':
-            loop_label = "Loop: Single"
-            loop_emoji = "🔂"
-            loop_style = discord.ButtonStyle.primary
-        elif current_loop_mode == 'queue':
-            loop_label = "Loop: Queue"
-            loop_emoji = "🔁"
-            loop_style = discord.ButtonStyle.primary
+        # Determine pause/resume and loop button states
+        pause_label, pause_emoji = self._PAUSE_BUTTON[self.pause_states.get(guild_id, False)]
+        loop_label, loop_emoji, loop_style = self._LOOP_BUTTON[self.loop_modes.get(guild_id, 'off')]
 
         # Add control buttons container
         control_container = Container(
@@ -1373,47 +1620,90 @@ class MusicCog(commands.Cog):
         )
         view.add_item(control_container)
 
+        return view, album_art_file, art_song
+
+    def _queue_state_key(self, guild_id: int, message_id: int) -> tuple:
+        """Everything the queue view of a guild shows, to tell whether a refresh would change anything"""
+        now_playing = self.now_playing.get(guild_id)
+        priority = self.priority_queues.get(guild_id, ())
+        regular = self.music_queues.get(guild_id, ())
+        return (
+            message_id,
+            now_playing['file_path'] if now_playing is not None else None,
+            self.pause_states.get(guild_id, False),
+            self.loop_modes.get(guild_id, 'off'),
+            len(priority),
+            len(regular),
+            # At most 6 priority and 8 regular rows are rendered
+            tuple(song['file_path'] for song in islice(priority, 6)),
+            tuple(song['file_path'] for song in islice(regular, 8)),
+        )
+
+    async def update_queue_message(self, interaction: discord.Interaction):
+        """Update the queue message with current state"""
+        guild_id = interaction.guild.id
+
+        # Nothing visible changed (e.g. a double click): skip the edit instead of spending a rate-limited call
+        state_key = self._queue_state_key(guild_id, interaction.message.id)
+        if self._queue_render_state.get(guild_id) == state_key:
+            return
+
+        # Reuse the album art already attached to this message while the same song is playing
+        attached = self._queue_art.get(guild_id)
+        attached_art = attached[1] if attached is not None and attached[0] == interaction.message.id else None
+        view, album_art_file, art_song = self._build_queue_view(guild_id, attached_art)
+
         # Update the original message with the new view
         try:
-            if 'album_art_file' in locals() and album_art_file is not None:
+            if album_art_file is not None:
                 await interaction.message.edit(view=view, attachments=[album_art_file])
+                self._queue_art[guild_id] = (interaction.message.id, art_song)
             else:
                 await interaction.message.edit(view=view)
+            # Only remember the render if the queue didn't move during the edit (or a concurrent refresh
+            # overtook this one); otherwise the message may be stale, so let the next refresh edit it again
+            if self._queue_state_key(guild_id, interaction.message.id) == state_key:
+                self._queue_render_state[guild_id] = state_key
+            else:
+                self._queue_render_state.pop(guild_id, None)
         except Exception as e:
             logger.warning(f"Could not update queue message: {e}")
             # Fallback to sending a new message
-            if 'album_art_file' in locals() and album_art_file is not None:
+            if album_art_file is not None:
                 await interaction.followup.send(view=view, file=album_art_file, ephemeral=True)
             else:
                 await interaction.followup.send(view=view, ephemeral=True)
 
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Drop per-guild playback state when the bot leaves or is kicked from a guild"""
+        self._clear_guild_state(guild.id)
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         """Handle voice channel state changes for music management"""
         guild = member.guild
         voice_client = guild.voice_client
 
+        # Forget the cached member count of a channel the bot has left or moved away from,
+        # and seed it with a single scan for the channel the bot has just joined
+        if member == guild.me and before.channel != after.channel:
+            if before.channel is not None:
+                self._human_counts.pop(before.channel.id, None)
+            if after.channel is not None:
+                self._human_counts[after.channel.id] = sum(1 for m in after.channel.members if not m.bot)
+
         # Check if bot disconnected (kicked, manually disconnected, etc.)
         if member == guild.me and before.channel is not None and after.channel is None:
             # Bot was disconnected from voice channel
             # Clear voice channel status if bot has permission (before disconnecting)
-            try:
-                if before.channel.permissions_for(guild.get_member(self.bot.user.id)).manage_channels:
-                    await before.channel.edit(status=None)
-            except (discord.Forbidden, AttributeError):
-                # No permission to edit channel status or channel no longer accessible, skip silently
-                pass
+            await self._set_channel_status(before.channel, None)
 
             # Clear Rich Presence when disconnected
-            try:
-                await self.bot.change_presence(activity=None)
-            except discord.Forbidden:
-                # No permission to change presence, skip silently
-                pass
+            self.queue_presence(None)
 
-            # Clear now playing for this guild
-            if guild.id in self.now_playing:
-                del self.now_playing[guild.id]
+            # Forget queues, now playing, flags and any pending alone timer for this guild
+            self._clear_guild_state(guild.id)
 
             return
 
@@ -1427,72 +1717,141 @@ class MusicCog(commands.Cog):
 
         channel = voice_client.channel
 
-        # Check if someone joined/left our channel
-        if before.channel == channel or after.channel == channel:
-            # Count non-bot members in the channel
-            human_members = [m for m in channel.members if not m.bot]
-
-            if len(human_members) == 0:
-                # Channel is now empty, pause music if playing
-                if voice_client.is_playing():
-                    voice_client.pause()
-                    logger.info(f"Paused music in {guild.name} - channel is empty")
-
-                # Start alone timer if not already started
-                if not hasattr(voice_client, 'alone_since'):
-                    voice_client.alone_since = asyncio.get_event_loop().time()
-                    # Schedule disconnect check
-                    asyncio.create_task(self.schedule_disconnect(guild, voice_client))
+        # Only care if someone joined/left our channel
+        if before.channel != channel and after.channel != channel:
+            return
 
-                # Update presence to show disconnect countdown immediately
-                try:
-                    await self.update_alone_presence(guild)
-                except discord.Forbidden:
-                    # No permission to change presence, skip silently
-                    pass
-                except Exception as e:
-                    logger.warning(f"Failed to update alone presence: {e}")
+        # Keep a running count of non-bot members instead of rescanning the channel on every event
+        previous_count = self._human_counts.get(channel.id)
+        if previous_count is None:
+            # Seed lazily with a single scan; channel.members already reflects this event
+            human_count = sum(1 for m in channel.members if not m.bot)
+        else:
+            human_count = max(0, previous_count + (before.channel != channel) - (after.channel != channel))
+        self._human_counts[channel.id] = human_count
+
+        if human_count == 0 and previous_count != 0:
+            # Channel just became empty, pause music if playing
+            if voice_client.is_playing():
+                voice_client.pause()
+                logger.info(f"Paused music in {guild.name} - channel is empty")
+
+            # Start alone timer if not already started
+            if guild.id not in self._alone_timers:
+                self._alone_timers[guild.id] = TimerState(time.monotonic())
+                # Schedule disconnect check, cancelled directly if someone returns
+                self._timer_tasks[guild.id] = asyncio.create_task(self.schedule_disconnect(guild, voice_client))
+
+            # Update presence to show disconnect countdown (debounced across event bursts);
+            # a short timeout skips the countdown presence like its refreshes
+            if self.ALONE_TIMEOUT > self.PRESENCE_THRESHOLD:
+                self._schedule_presence_update(guild, lambda: self._show_alone_countdown(guild))
+
+        elif human_count > 0 and not previous_count:
+            # People are back - always resume and restore normal presence
+            timer = self._alone_timers.pop(guild.id, None)
+            was_alone = timer is not None
+
+            if voice_client.is_paused():
+                voice_client.resume()
+                logger.info(f"Resumed music in {guild.name} - people returned")
+
+            # Reset alone timer and abort the pending disconnect
+            if timer is not None:
+                timer.cancelled = True
+            task = self._timer_tasks.pop(guild.id, None)
+            if task is not None:
+                task.cancel()
+
+            # Always restore normal music presence when people return (debounced across event bursts)
+            self._schedule_presence_update(guild, lambda: self._spawn(self.restore_music_presence(guild, was_alone)))
+
+    def _schedule_presence_update(self, guild: discord.Guild, update):
+        """Call update shortly from the loop, replacing any update still pending for this guild"""
+        pending = self._presence_handles.pop(guild.id, None)
+        if pending is not None:
+            pending.cancel()
+
+        def fire():
+            self._presence_handles.pop(guild.id, None)
+            update()
+
+        self._presence_handles[guild.id] = asyncio.get_running_loop().call_later(self.PRESENCE_DEBOUNCE, fire)
+
+    async def _set_channel_status(self, channel, status: str | None):
+        """Set (or clear with None) a voice channel status when the bot may manage the channel"""
+        try:
+            # guild.me is the cached bot member, no lookup by id needed
+            if channel.permissions_for(channel.guild.me).manage_channels:
+                await channel.edit(status=status)
+        except (discord.Forbidden, AttributeError):
+            # No permission to edit channel status or channel no longer accessible, skip silently
+            pass
 
-            elif len(human_members) > 0:
-                # People are back - always resume and restore normal presence
-                was_alone = hasattr(voice_client, 'alone_since')
+    async def _retry_with_backoff(self, operation):
+        """Await operation(), retrying transient Discord failures with full-jitter exponential backoff.
+        Client errors (4xx) and the final failure are raised to the caller."""
+        for attempt in range(self.RETRY_ATTEMPTS):
+            try:
+                return await operation()
+            except discord.HTTPException as e:
+                if e.status < 500 or attempt == self.RETRY_ATTEMPTS - 1:
+                    raise
+            except discord.ConnectionClosed:
+                if attempt == self.RETRY_ATTEMPTS - 1:
+                    raise
+            # Full jitter spreads retries out when many guilds fail at once
+            await asyncio.sleep(random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt)))
+
+    def queue_presence(self, activity):
+        """Request a Rich Presence change; superseded requests are dropped by the worker"""
+        self._presence_queue.put_nowait(activity)
+
+    async def _presence_worker(self):
+        """Apply queued presence changes, sending only the latest state of each burst"""
+        while True:
+            activity = await self._presence_queue.get()
+            # Drain anything that arrived meanwhile and keep only the most recent state
+            while not self._presence_queue.empty():
+                activity = self._presence_queue.get_nowait()
 
-                if voice_client.is_paused():
-                    voice_client.resume()
-                    logger.info(f"Resumed music in {guild.name} - people returned")
+            try:
+                await self._retry_with_backoff(lambda: self.bot.change_presence(activity=activity))
+            except discord.Forbidden:
+                # No permission to change presence, skip silently
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to update presence: {e}")
 
-                # Reset alone timer
-                if hasattr(voice_client, 'alone_since'):
-                    delattr(voice_client, 'alone_since')
+            # Batch window so rapid updates collapse into the next send
+            await asyncio.sleep(self.PRESENCE_BATCH_WINDOW)
 
-                # Always restore normal music presence when people return
-                try:
-                    if guild.id in self.now_playing:
-                        song_info = self.now_playing[guild.id]
-                        activity = discord.Activity(
-                            type=discord.ActivityType.listening,
-                            name=song_info['title'],
-                            details=f"by {song_info['artist']}",
-                            state=f"Duration: {song_info.get('duration_str', 'Unknown')}"
-                        )
-                        await self.bot.change_presence(activity=activity)
-                    elif was_alone:
-                        # If we were alone but no music is playing, clear presence
-                        await self.bot.change_presence(activity=None)
-                except discord.Forbidden:
-                    # No permission to change presence, skip silently
-                    pass
-                except Exception as e:
-                    logger.warning(f"Failed to update presence on return: {e}")
+    async def restore_music_presence(self, guild: discord.Guild, was_alone: bool):
+        """Restore the now playing Rich Presence once people are back in the channel"""
+        if guild.id in self.now_playing:
+            song_info = self.now_playing[guild.id]
+            activity = discord.Activity(
+                type=discord.ActivityType.listening,
+                name=song_info['title'],
+                details=f"by {song_info['artist']}",
+                state=f"Duration: {song_info.get('duration_str', 'Unknown')}"
+            )
+            self.queue_presence(activity)
+        elif was_alone:
+            # If we were alone but no music is playing, clear presence
+            self.queue_presence(None)
 
-    async def update_alone_presence(self, guild: discord.Guild):
-        """Update Rich Presence to show disconnect countdown when alone"""
+    def _show_alone_countdown(self, guild: discord.Guild, now: float | None = None):
+        """Queue the disconnect countdown presence of a guild the bot is alone in"""
         try:
-            voice_client = guild.voice_client
-            if not voice_client or not hasattr(voice_client, 'alone_since'):
+            timer = self._alone_timers.get(guild.id)
+            if not guild.voice_client or timer is None or timer.cancelled:
                 return
 
-            alone_time = asyncio.get_event_loop().time() - voice_client.alone_since
+            # Callers ticking a countdown pass one monotonic snapshot per tick
+            if now is None:
+                now = time.monotonic()
+            alone_time = now - timer.started_at
             remaining_time = max(0, self.ALONE_TIMEOUT - alone_time)
 
             if remaining_time > 0:
@@ -1505,57 +1864,107 @@ class MusicCog(commands.Cog):
                     details=f"Disconnecting in {minutes}:{seconds:02d}",
                     state=f"🎵 {guild.name}"
                 )
-                await self.bot.change_presence(activity=activity)
+                self.queue_presence(activity)
 
         except Exception as e:
             logger.error(f"Error updating alone presence: {e}")
 
     async def schedule_disconnect(self, guild: discord.Guild, voice_client):
         """Schedule automatic disconnect after alone timeout"""
+        timer = self._alone_timers.get(guild.id)
+        task = asyncio.current_task()
         try:
-            # Update presence periodically while alone
-            update_interval = 5  # Update every 5 seconds
-            updates_remaining = self.ALONE_TIMEOUT // update_interval
-
-            for _ in range(updates_remaining):
-                if not hasattr(voice_client, 'alone_since'):
-                    # Timer was cancelled
+            # Sleep out the timeout in one go; the task is cancelled if someone returns.
+            # The countdown presence is refreshed by loop callbacks meanwhile, so waiting costs no wakeups
+            started_at = timer.started_at if timer is not None else time.monotonic()
+            deadline = started_at + self.ALONE_TIMEOUT
+            # A short timeout is over before a refresh would matter
+            if timer is not None and self.ALONE_TIMEOUT > self.PRESENCE_THRESHOLD:
+                self._schedule_countdown_tick(guild, timer)
+            try:
+                await asyncio.sleep(max(0, deadline - time.monotonic()))
+            except asyncio.CancelledError:
+                if timer is not None and timer.cancelled:
+                    # Someone came back, nothing to do
                     return
-                await self.update_alone_presence(guild)
-                await asyncio.sleep(update_interval)
-
-            # Final check - full timeout reached
-            if (hasattr(voice_client, 'alone_since') and
-                voice_client.is_connected() and
-                len([m for m in voice_client.channel.members if not m.bot]) == 0):
+                # Shutdown, cog unload or guild teardown: let the outer handler propagate it
+                raise
+            finally:
+                # Stop only this timer's countdown; a newer timer of the guild has its own
+                if timer is not None and timer.countdown is not None:
+                    timer.countdown.cancel()
+                    timer.countdown = None
+
+            if self._timer_tasks.get(guild.id) is task:
+                del self._timer_tasks[guild.id]
+            if self._alone_timers.get(guild.id) is timer:
+                del self._alone_timers[guild.id]
+
+            # Final check - full timeout reached, still connected and nobody came back
+            if timer is None or timer.cancelled or not voice_client.is_connected():
+                return
+            channel = voice_client.channel
+            if self._human_counts.get(channel.id, 0) == 0:
 
                 # Clear voice channel status if bot has permission
-                try:
-                    if voice_client.permissions_for(guild.get_member(self.bot.user.id)).manage_channels:
-                        await voice_client.edit(status=None)
-                except (discord.Forbidden, AttributeError):
-                    # No permission to edit channel status or no voice channel, skip silently
-                    pass
+                await self._set_channel_status(channel, None)
 
-                await voice_client.disconnect()
-                logger.info(f"Disconnected from {guild.name} - alone for {self.ALONE_TIMEOUT} seconds")
+                await self._retry_with_backoff(voice_client.disconnect)
+                logger.info("Disconnected from %s - alone for %d seconds", guild.name, self.ALONE_TIMEOUT)
 
                 # Clear Rich Presence
-                await self.bot.change_presence(activity=None)
+                self.queue_presence(None)
 
                 # Clear now playing for this guild
-                if guild.id in self.now_playing:
-                    del self.now_playing[guild.id]
-
-        except Exception as e:
-            logger.error(f"Error in scheduled disconnect: {e}")
+                self._set_now_playing(guild.id, None)
+
+        except asyncio.CancelledError:
+            # Shutdown or cog unload - don't treat it as a failed disconnect
+            raise
+        except (discord.HTTPException, discord.ConnectionClosed):
+            logger.exception("Error in scheduled disconnect for %s", guild.name)
+
+    def _schedule_countdown_tick(self, guild: discord.Guild, timer: TimerState):
+        """Schedule the next countdown presence refresh of an alone timer"""
+        timer.countdown = asyncio.get_running_loop().call_later(self.PRESENCE_UPDATE_INTERVAL, self._tick_alone_countdown, guild, timer)
+
+    def _tick_alone_countdown(self, guild: discord.Guild, timer: TimerState):
+        """Loop callback refreshing the countdown presence every PRESENCE_UPDATE_INTERVAL until the timer ends"""
+        timer.countdown = None
+        if timer.cancelled or self._alone_timers.get(guild.id) is not timer:
+            return
+        now = time.monotonic()
+        remaining = timer.started_at + self.ALONE_TIMEOUT - now
+        if remaining <= 0:
+            return
+        self._show_alone_countdown(guild, now)
+        if remaining > self.PRESENCE_UPDATE_INTERVAL:
+            self._schedule_countdown_tick(guild, timer)
+
+    def _read_song_stats(self):
+        """Read and parse the stats file, or None if there is none (blocking, runs on the I/O pool)"""
+        if not self.STATS_FILE.exists():
+            return None
+        with open(self.STATS_FILE, 'rb') as f:
+            song_stats = _json_loads(f.read())
+
+        for stats in song_stats.values():
+            # JSON has no Counter, restore it so request counts can be bumped without a membership check
+            stats['request_users'] = Counter(stats.get('request_users', {}))
+
+            # Older files kept the last 100 session durations instead of a session count
+            if 'session_count' not in stats:
+                sessions = stats.pop('play_sessions', [])
+                # Past 100 sessions the list was truncated, started plays is the closest count left
+                stats['session_count'] = len(sessions) if len(sessions) < 100 else max(len(sessions), stats.get('started_plays', 0))
+        return song_stats
 
     async def load_song_stats(self):
         """Load song statistics from file on startup"""
         try:
-            if self.STATS_FILE.exists():
-                with open(self.STATS_FILE, 'r', encoding='utf-8') as f:
-                    self.song_stats = json.load(f)
+            song_stats = await self._run_io(self._read_song_stats)
+            if song_stats is not None:
+                self.song_stats = song_stats
                 #logger.info(f"Loaded song stats for {len(self.song_stats)} songs")
             else:
                 self.song_stats = {}
@@ -1563,141 +1972,144 @@ class MusicCog(commands.Cog):
         except Exception as e:
             logger.error(f"Failed to load song stats: {e}")
             self.song_stats = {}
+        self._rebuild_top_played()
+
+    def _top_played_key(self, file_path: str) -> tuple[int, str]:
+        """Ranking of a song in _top_played; ties in play count are broken by file path"""
+        return self.song_stats[file_path]['started_plays'], file_path
+
+    def _rebuild_top_played(self):
+        """Recompute the most played songs from scratch (after the stats are loaded)"""
+        self._top_played = heapq.nlargest(self.TOP_PLAYED_SIZE, self.song_stats, key=self._top_played_key)
+
+    def _bump_top_played(self, file_path: str):
+        """Keep _top_played current after a song's started_plays went up"""
+        top = self._top_played
+        key = self._top_played_key
+        if file_path not in top:
+            # Play counts only grow, so only the song that just played can enter the list
+            if len(top) >= self.TOP_PLAYED_SIZE and key(top[-1]) >= key(file_path):
+                return
+            top.append(file_path)
+        # Same key as _rebuild_top_played, so ties list in the same order either way
+        top.sort(key=key, reverse=True)
+        del top[self.TOP_PLAYED_SIZE:]
+
+    def _write_song_stats(self, payload: bytes):
+        """Write serialized song stats to disk (blocking)"""
+        # Ensure directory exists
+        self.STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write a temp file and swap it in, so a crash mid-write never leaves a truncated stats file
+        tmp = self.STATS_FILE.with_suffix('.json.tmp')
+        tmp.write_bytes(payload)
+        os.replace(tmp, self.STATS_FILE)
 
     def save_song_stats(self):
-        """Save song statistics to file"""
+        """Save song statistics to file right away (blocking, used for the final flush)"""
         try:
-            # Ensure directory exists
-            self.STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(self.STATS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.song_stats, f, ensure_ascii=False, indent=2)
+            self._write_song_stats(_json_dumps(self.song_stats, indent=True))
+            self._stats_dirty = False
 
             #logger.info(f"Saved song stats for {len(self.song_stats)} songs")
         except Exception as e:
             logger.error(f"Failed to save song stats: {e}")
 
+    def _mark_stats_dirty(self):
+        """Schedule a stats write; updates arriving before it runs share the same write"""
+        self._stats_dirty = True
+        if self._stats_task is None or self._stats_task.done():
+            self._stats_task = asyncio.create_task(self._stats_flusher())
+
+    async def _stats_flusher(self):
+        """Write song stats at most once per STATS_FLUSH_INTERVAL, exiting once they are saved"""
+        while self._stats_dirty:
+            await asyncio.sleep(self.STATS_FLUSH_INTERVAL)
+
+            # Clear first so updates made during the write mark the stats dirty again
+            self._stats_dirty = False
+            try:
+                # Serialize on the event loop so the snapshot is consistent, then write off the loop
+                payload = _json_dumps(self.song_stats, indent=True)
+                await self._run_io(self._write_song_stats, payload)
+            except Exception as e:
+                self._stats_dirty = True
+                logger.error(f"Failed to save song stats: {e}")
+
     def update_song_stats(self, file_path: str, event_type: str = 'queued', queue_type: str = 'regular', user_id: str = None):
         """Update statistics for a song
 
         event_type: 'queued' (added to queue), 'started' (began playing), 'completed' (finished playing), 'skipped' (was skipped)
         queue_type: 'priority' or 'regular' (only used for queued events)
         """
-        import time
         current_time = time.time()
 
-        if file_path not in self.song_stats:
-            self.song_stats[file_path] = {
-                # Queue tracking
-                'queued_total': 0,
-                'queued_priority': 0,
-                'queued_regular': 0,
-                'first_queued': current_time,
-                'last_queued': current_time,
-
-                # Playback tracking
-                'started_plays': 0,
-                'started_priority': 0,
-                'started_regular': 0,
-                'completed_plays': 0,
-                'completed_priority': 0,
-                'completed_regular': 0,
-                'skipped_plays': 0,
-                'skipped_priority': 0,
-                'skipped_regular': 0,
-                'first_played': None,
-                'last_played': None,
-
-                # Time tracking
-                'total_play_time': 0,
-                'play_sessions': [],
-
-                # User tracking
-                'request_users': {}
-            }
-
-        stats = self.song_stats[file_path]
-
-        if event_type == 'queued':
-            # Song was added to a queue
-            stats['queued_total'] += 1
-            if queue_type == 'priority':
-                stats['queued_priority'] += 1
-            else:
-                stats['queued_regular'] += 1
-            stats['last_queued'] = current_time
-
-            # Track requesting user
-            if user_id:
-                user_key = str(user_id)
-                if user_key not in stats['request_users']:
-                    stats['request_users'][user_key] = 0
-                stats['request_users'][user_key] += 1
-
-        elif event_type == 'started':
-            # Song actually started playing
-            stats['started_plays'] += 1
-            if queue_type == 'priority':
-                stats['started_priority'] += 1
-            else:
-                stats['started_regular'] += 1
-            if stats['first_played'] is None:
-                stats['first_played'] = current_time
-            stats['last_played'] = current_time
-
-            # Track requesting user for started songs (for immediate plays)
-            if user_id:
-                user_key = str(user_id)
-                if user_key not in stats['request_users']:
-                    stats['request_users'][user_key] = 0
-                stats['request_users'][user_key] += 1
-
-        elif event_type == 'completed':
-            # Song finished playing completely
-            stats['completed_plays'] += 1
-            if queue_type == 'priority':
-                stats['completed_priority'] += 1
-            else:
-                stats['completed_regular'] += 1
-
-        elif event_type == 'skipped':
-            # Song was skipped during playback
-            stats['skipped_plays'] += 1
-            if queue_type == 'priority':
-                stats['skipped_priority'] += 1
-            else:
-                stats['skipped_regular'] += 1
-
-        # Save stats after every update for now (can be optimized later)
-        self.save_song_stats()
+        stats = self.song_stats.get(file_path)
+        if stats is None:
+            stats = self.song_stats[file_path] = _new_stats_entry(current_time)
+
+        handler = self._stats_handlers.get(event_type)
+        if handler is not None:
+            handler(file_path, stats, queue_type == 'priority', user_id, current_time)
+
+        # Written out by _stats_flusher
+        self._mark_stats_dirty()
+
+    def _stats_queued(self, file_path: str, stats: dict, priority: bool, user_id: str | None, now: float):
+        """Song was added to a queue"""
+        stats['queued_total'] += 1
+        stats['queued_priority' if priority else 'queued_regular'] += 1
+        stats['last_queued'] = now
+
+        # Track requesting user
+        if user_id:
+            stats['request_users'][str(user_id)] += 1
+
+    def _stats_started(self, file_path: str, stats: dict, priority: bool, user_id: str | None, now: float):
+        """Song actually started playing"""
+        stats['started_plays'] += 1
+        self._bump_top_played(file_path)
+        stats['started_priority' if priority else 'started_regular'] += 1
+        if stats['first_played'] is None:
+            stats['first_played'] = now
+        stats['last_played'] = now
+
+        # Track requesting user for started songs (for immediate plays)
+        if user_id:
+            stats['request_users'][str(user_id)] += 1
+
+    def _stats_completed(self, file_path: str, stats: dict, priority: bool, user_id: str | None, now: float):
+        """Song finished playing completely"""
+        stats['completed_plays'] += 1
+        stats['completed_priority' if priority else 'completed_regular'] += 1
+
+    def _stats_skipped(self, file_path: str, stats: dict, priority: bool, user_id: str | None, now: float):
+        """Song was skipped during playback"""
+        stats['skipped_plays'] += 1
+        stats['skipped_priority' if priority else 'skipped_regular'] += 1
 
     def record_skip(self, file_path: str):
         """Record a skip for a song"""
         if file_path in self.song_stats:
             self.song_stats[file_path]['skips'] += 1
+            self._mark_stats_dirty()
 
     def record_play_duration(self, file_path: str, duration: float):
         """Record the duration a song was played"""
         if file_path in self.song_stats:
-            self.song_stats[file_path]['total_play_time'] += duration
-            self.song_stats[file_path]['play_sessions'].append(duration)
-
-            # Keep only last 100 sessions to prevent unlimited growth
-            if len(self.song_stats[file_path]['play_sessions']) > 100:
-                self.song_stats[file_path]['play_sessions'] = self.song_stats[file_path]['play_sessions'][-100:]
+            stats = self.song_stats[file_path]
+            # A running total and count are all the average needs
+            stats['total_play_time'] += duration
+            stats['session_count'] += 1
+            self._mark_stats_dirty()
 
     async def handle_play_again_button(self, interaction: discord.Interaction, custom_id: str):
         """Handle play again button clicks"""
         # Parse custom_id format: play_again_{guild_id}
-        parts = custom_id.split('_')
-        if len(parts) != 3:
-            return
-
-        _, _, guild_id_str = parts
-        try:
-            guild_id = int(guild_id_str)
-        except ValueError:
+        match = _PLAY_AGAIN_ID_RE.fullmatch(custom_id)
+        if match is None:
             return
+        guild_id = int(match[1])
 
         # Check if user is in voice channel
         if not interaction.user.voice:
@@ -1705,11 +2117,11 @@ class MusicCog(commands.Cog):
             return
 
         # Check bot permissions for voice channel
-        bot_member = interaction.guild.get_member(self.bot.user.id)
-        if not interaction.user.voice.channel.permissions_for(bot_member).connect:
+        permissions = interaction.user.voice.channel.permissions_for(interaction.guild.me)
+        if not permissions.connect:
             await interaction.response.send_message("I don't have permission to connect to your voice channel.", ephemeral=True)
             return
-        if not interaction.user.voice.channel.permissions_for(bot_member).speak:
+        if not permissions.speak:
             await interaction.response.send_message("I don't have permission to speak in your voice channel.", ephemeral=True)
             return
 
@@ -1725,20 +2137,13 @@ class MusicCog(commands.Cog):
         # Defer the interaction to prevent timeout
         await interaction.response.defer()
 
-        # Add 3 random songs to start playing again
-        await self.add_random_songs(guild_id, min_count=3)
-
-        # Ensure we have at least 3 songs in the queue before proceeding
-        current_queue_count = len(self.music_queues.get(guild_id, []))
-        if current_queue_count < 3:
-            # Try to add more songs if we don't have enough
-            additional_needed = 3 - current_queue_count
-            await self.add_random_songs(guild_id, min_count=additional_needed)
+        # Fill the queue up to 3 random songs to start playing again
+        await self.add_random_songs(guild_id)
 
         # Try to play the first song
         if guild_id in self.music_queues and self.music_queues[guild_id]:
-            next_song = self.music_queues[guild_id].pop(0)
-            self.now_playing[guild_id] = next_song
+            next_song = self._dequeue(guild_id)
+            self._set_now_playing(guild_id, next_song)
             # Play the song without sending a message
             await self.play_song(interaction, next_song, send_message=False)
 
@@ -1748,20 +2153,20 @@ class MusicCog(commands.Cog):
             # Update the message with the full queue view
             await self.update_queue_message(interaction)
         else:
-            await interaction.response.send_message("No songs available to play.", ephemeral=True)
+            await interaction.followup.send("No songs available to play.", ephemeral=True)
 
     @app_commands.command(name="skip", description="Skip the current song")
     async def skip(self, interaction: discord.Interaction):
-        if interaction.user.voice is None:
-            await interaction.response.send_message("You are not connected to a voice channel.", ephemeral=True)
-            return
-
-        if interaction.guild.voice_client is None:
-            await interaction.response.send_message("I'm not currently playing music.", ephemeral=True)
-            return
-
-        if not interaction.guild.voice_client.is_playing():
-            await interaction.response.send_message("No song is currently playing.", ephemeral=True)
+        voice_client = interaction.guild.voice_client
+        user_voice = interaction.user.voice
+        if user_voice is None or voice_client is None or not voice_client.is_playing():
+            if user_voice is None:
+                error = self._SKIP_MSG_NO_VOICE
+            elif voice_client is None:
+                error = self._SKIP_MSG_NOT_CONNECTED
+            else:
+                error = self._SKIP_MSG_NOT_PLAYING
+            await interaction.response.send_message(**error)
             return
 
         # Mark as skip in progress (on_song_end will handle the stats recording)
@@ -1769,14 +2174,12 @@ class MusicCog(commands.Cog):
         self.skip_in_progress[guild_id] = True
 
         # Stop current song (this will trigger on_song_end)
-        interaction.guild.voice_client.stop()
+        voice_client.stop()
 
         # Ensure we maintain 3 songs in regular queue after skip
-        current_regular_count = len(self.music_queues.get(guild_id, []))
-        if current_regular_count < 3:
-            songs_to_add = 3 - current_regular_count
+        if len(self.music_queues.get(guild_id, ())) < 3:
             # Add random songs in background without awaiting
-            asyncio.create_task(self.add_random_songs(guild_id, min_count=songs_to_add))
+            self.request_refill(guild_id)
 
         await interaction.response.send_message("⏭️ Skipped current song!", ephemeral=True)
 
@@ -1786,11 +2189,7 @@ class MusicCog(commands.Cog):
         await interaction.response.defer()
 
         # Find the song in cache
-        song_info = None
-        for song in self.song_cache:
-            if song['display_name'] == song_name:
-                song_info = song
-                break
+        song_info = self.song_by_name.get(song_name)
 
         if not song_info:
             await interaction.response.send_message(f"Song `{song_name}` not found in library.", ephemeral=True)
@@ -1805,13 +2204,10 @@ class MusicCog(commands.Cog):
         stats = self.song_stats[file_path]
 
         # Format the stats display
-        import time
-        from datetime import datetime
-
         # Calculate average play duration
         avg_duration = 0
-        if stats['play_sessions']:
-            avg_duration = sum(stats['play_sessions']) / len(stats['play_sessions'])
+        if stats['session_count']:
+            avg_duration = stats['total_play_time'] / stats['session_count']
 
         # Format timestamps
         first_played = datetime.fromtimestamp(stats['first_played']).strftime('%Y-%m-%d %H:%M')
@@ -1825,16 +2221,7 @@ class MusicCog(commands.Cog):
         view = LayoutView()
 
         # Try to get album art
-        album_art = None
-        album_art_file = None
-        try:
-            audio = MP3(song_info['file_path'], ID3=ID3)
-            if 'APIC:' in audio:
-                album_art_data = audio['APIC:'].data
-                album_art_file = discord.File(BytesIO(album_art_data), filename="album_art.jpg")
-                album_art = discord.ui.Thumbnail(media=album_art_file)
-        except Exception as e:
-            logger.warning(f"Could not extract album art for stats: {e}")
+        album_art_file, album_art = self._album_art(song_info)
 
         stats_container = Container()
         stats_container.add_item(Section(
@@ -1869,19 +2256,23 @@ class MusicCog(commands.Cog):
         ))
 
         # User statistics
-        top_users = sorted(stats['request_users'].items(), key=lambda x: x[1], reverse=True)[:5]
+        top_users = stats['request_users'].most_common(3)  # Limit to 3 users
         if top_users:
-            user_stats = []
-            for user_id, count in top_users:
-                try:
-                    user = await self.bot.fetch_user(int(user_id))
-                    user_stats.append(f"{user.display_name}: {count}")
-                except:
-                    user_stats.append(f"User {user_id}: {count}")
+            async def resolve_user(user_id: str):
+                # Cached users cost no API call, only the others are fetched
+                user = self.bot.get_user(int(user_id))
+                return user if user is not None else await self.bot.fetch_user(int(user_id))
+
+            # Fetch concurrently so the wait is one round-trip instead of one per user
+            users = await asyncio.gather(*(resolve_user(user_id) for user_id, _ in top_users), return_exceptions=True)
+            user_stats = [
+                f"User {user_id}: {count}" if isinstance(user, Exception) else f"{user.display_name}: {count}"
+                for (user_id, count), user in zip(top_users, users)
+            ]
 
             stats_container.add_item(Section(
                 TextDisplay("**Top Requesters**"),
-                *[TextDisplay(f"👤 {stat}") for stat in user_stats[:3]],  # Limit to 3 users
+                *[TextDisplay(f"👤 {stat}") for stat in user_stats],
             ))
 
         view.add_item(stats_container)
@@ -1900,8 +2291,8 @@ class MusicCog(commands.Cog):
             await interaction.response.send_message("No song statistics available yet.", ephemeral=True)
             return
 
-        # Sort songs by started plays (accurate play count)
-        sorted_songs = sorted(self.song_stats.items(), key=lambda x: x[1]['started_plays'], reverse=True)[:10]
+        # Top 10 songs by started plays (accurate play count), maintained as songs start
+        sorted_songs = [(file_path, self.song_stats[file_path]) for file_path in self._top_played]
 
         # Create top played display using LayoutView
         view = LayoutView()
@@ -1912,11 +2303,7 @@ class MusicCog(commands.Cog):
 
         for i, (file_path, stats) in enumerate(sorted_songs, 1):
             # Find song info from cache
-            song_info = None
-            for song in self.song_cache:
-                if song['file_path'] == file_path:
-                    song_info = song
-                    break
+            song_info = self.song_by_path.get(file_path)
 
             if song_info:
                 top_container.add_item(TextDisplay(f"#{i} **{song_info['title']}**"))
@@ -1945,8 +2332,8 @@ class MusicCog(commands.Cog):
             await interaction.followup.send("No songs with sufficient data to calculate skip rates.", ephemeral=True)
             return
 
-        # Sort by skip rate (descending)
-        sorted_songs = sorted(songs_with_skips, key=lambda x: x[2], reverse=True)[:10]
+        # Top 10 by skip rate (descending)
+        sorted_songs = heapq.nlargest(10, songs_with_skips, key=lambda x: x[2])
 
         # Create most skipped display using LayoutView
         view = LayoutView()
@@ -1957,11 +2344,7 @@ class MusicCog(commands.Cog):
 
         for i, (file_path, stats, skip_rate) in enumerate(sorted_songs, 1):
             # Find song info from cache
-            song_info = None
-            for song in self.song_cache:
-                if song['file_path'] == file_path:
-                    song_info = song
-                    break
+            song_info = self.song_by_path.get(file_path)
 
             if song_info:
                 total_interactions = stats['started_plays'] + stats['skipped_plays']
@@ -0,0 +1,55 @@
+import hashlib
+import os
+from pathlib import Path
+from mutagen.mp3 import MP3
+from mutagen.id3 import ID3
+
+# Kept free of discord/kokoro imports: only mutagen is needed to read a song's cache entry
+
+
+def _art_path(art_dir: str, path_str: str) -> str:
+    """Location of the cached album art of a song"""
+    return os.path.join(art_dir, f"{hashlib.blake2b(path_str.encode('utf-8', 'surrogateescape'), digest_size=16).hexdigest()}.jpg")
+
+
+def _write_art(art_dir: str, path_str: str, data: bytes) -> str:
+    """Write album art bytes to the art cache (atomically) and return the file path"""
+    art_path = _art_path(art_dir, path_str)
+    os.makedirs(art_dir, exist_ok=True)
+    partial = f"{art_path}.{os.getpid()}.part"
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, art_path)
+    return art_path
+
+
+def _extract_metadata(path_str: str, art_dir: str):
+    """Read the cache entry of one MP3, returning (song_info, error) with a filename fallback on failure"""
+    mp3_file = Path(path_str)
+    try:
+        audio = MP3(mp3_file, ID3=ID3)
+        title = audio.get('TIT2', mp3_file.stem).text[0] if audio.get('TIT2') else mp3_file.stem
+        artist = audio.get('TPE1', 'Unknown Artist').text[0] if audio.get('TPE1') else 'Unknown Artist'
+
+        # Extract the album art once here so playing a song never re-parses the MP3 for it
+        art_path = _write_art(art_dir, path_str, audio['APIC:'].data) if 'APIC:' in audio else None
+
+        # Create display name with artist
+        display_name = f"{title} - {artist}"
+        return {
+            'file_path': path_str,
+            'title': title,
+            'artist': artist,
+            'display_name': display_name,
+            'duration': int(audio.info.length) if audio.info else 0,
+            'art_path': art_path
+        }, None
+    except Exception as e:
+        # Fallback to filename
+        return {
+            'file_path': path_str,
+            'title': mp3_file.stem,
+            'artist': 'Unknown Artist',
+            'display_name': f"{mp3_file.stem} - Unknown Artist",
+            'duration': 0
+        }, str(e)
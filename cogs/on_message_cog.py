@@ -1,6 +1,5 @@
 import discord
 import asyncio
-import time
 import re # Added for regex
 from urllib.parse import urlparse # Added for URL parsing
 from discord.ext import commands
@@ -57,7 +56,7 @@ class OnMessageCog(commands.Cog):
         chunks = self.split_by_words(text)
         for chunk in chunks:
             await message.reply(chunk)
-            time.sleep(0.5)  # Rate limiting
+            await asyncio.sleep(0.5)  # Rate limiting, without blocking the event loop
 
     async def generate_ai_response(self, prompt_content, message: discord.Message):
         """Core AI response generation. Handles both text and multimodal prompts."""
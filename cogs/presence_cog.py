@@ -48,12 +48,13 @@ class PresenceCog(commands.Cog):
                         should_skip_presence = True
                         break
 
-                    # Also check if bot is alone in any voice channel (showing disconnect countdown)
-                    for guild in self.bot.guilds:
-                        voice_client = guild.voice_client
-                        if (voice_client and voice_client.is_connected() and
-                            hasattr(voice_client, 'alone_since') and
-                            len([m for m in voice_client.channel.members if not m.bot]) == 0):
+                    # Also check if bot is alone in any voice channel (showing disconnect countdown).
+                    # The music cog keeps an alone timer per guild exactly while the bot sits in an
+                    # empty voice channel (it replaced the old VoiceClient.alone_since attribute)
+                    for guild_id in getattr(cog, '_alone_timers', {}):
+                        guild = self.bot.get_guild(guild_id)
+                        voice_client = guild.voice_client if guild is not None else None
+                        if voice_client and voice_client.is_connected():
                             should_skip_presence = True
                             break
 
@@ -1,6 +1,7 @@
 import discord
 import settings
 import asyncio
+import sys
 from discord.ext import commands
 from settings import logger
 from context_menus import image_metadata_context_menu 
@@ -97,7 +98,21 @@ async def main():
         if not bot.is_closed():
             await bot.close()
 
+def install_fast_event_loop():
+    """Use uvloop (winloop on Windows) for the event loop when it is installed"""
+    try:
+        if sys.platform == "win32":
+            import winloop as fast_loop
+        else:
+            import uvloop as fast_loop
+    except ImportError:
+        logger.info("uvloop/winloop not installed, using the default asyncio event loop")
+        return
+    asyncio.set_event_loop_policy(fast_loop.EventLoopPolicy())
+    logger.info(f"Using {fast_loop.__name__} event loop")
+
 def run():
+    install_fast_event_loop()
     loop = asyncio.get_event_loop()
     try:
         loop.run_until_complete(main())
@@ -3,6 +3,9 @@ import os
 import discord
 import logging
 import json
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from google.generativeai import types
 from google import genai
 import base64
@@ -134,5 +137,25 @@ logger = logging.getLogger("bot")
 
 dictConfig(LOGGING_CONFIG)
 
+def _log_in_background(name):
+    """Swap a logger's handlers for a QueueHandler so stream/file writes happen on a listener thread"""
+    target = logging.getLogger(name)
+    handlers = target.handlers[:]
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        target.removeHandler(handler)
+    target.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+for _name in LOGGING_CONFIG["loggers"]:
+    _log_in_background(_name)
+
+# Quantize the Kokoro TTS model to int8 on CPU (music cog announcements)
+TTS_QUANTIZE = os.getenv('TTS_QUANTIZE', 'false').lower() in ('1', 'true', 'yes')
+# Device for Kokoro TTS inference: 'auto' picks CUDA when available, or force 'cuda' / 'cpu'
+TTS_DEVICE = os.getenv('TTS_DEVICE', 'auto').lower()
+
 # Prompt Inspector monitored channels
 monitored_channels = [int(x) for x in os.getenv('MONITORED_CHANNELS', '').split(',') if x]